@@ -0,0 +1,89 @@
+"""
+Memory and throughput of the two ways of turning an Alpaca bars response into a data frame.
+
+- dicts:   BarSet models -> BarSet.dict() -> a list with a dict per bar -> DataFrame
+- columns: raw payload -> core.bar_columns lists -> DataFrame built column by column
+
+The payload is synthetic minute bars, so no Alpaca credentials are needed.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.bench_alpaca_columnar [--symbols 100] [--minutes 5000]
+"""
+
+from alpaca.data import BarSet
+from datetime import datetime, timedelta, timezone
+from pandas import DataFrame
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from core.bar_columns import bar_columns_frame, bar_columns_from_raw
+
+import argparse
+import random
+import tracemalloc
+
+
+def synthetic_payload(symbols: int, minutes: int) -> Dict[str, List[Dict[str, Any]]]:
+    start = datetime(2025, 1, 2, 14, 30, tzinfo=timezone.utc)
+    payload = {}
+    for index in range(symbols):
+        price = random.uniform(10, 500)
+        bars = []
+        for minute in range(minutes):
+            price *= random.uniform(0.999, 1.001)
+            bars.append({
+                "t": (start + timedelta(minutes=minute)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "o": price,
+                "h": price * 1.001,
+                "l": price * 0.999,
+                "c": price,
+                "v": random.randint(100, 100000),
+                "n": random.randint(1, 500),
+                "vw": price,
+            })
+        payload[f"SYM{index}"] = bars
+
+    return payload
+
+
+def dicts_path(payload: Dict[str, List[Dict[str, Any]]]) -> DataFrame:
+    bars = []
+    for symbol_bars in BarSet(payload).dict().values():
+        bars.extend(symbol_bars)
+    return DataFrame(bars)
+
+
+def columns_path(payload: Dict[str, List[Dict[str, Any]]]) -> DataFrame:
+    return bar_columns_frame(bar_columns_from_raw(payload))
+
+
+def measure(path: Callable[[Dict], DataFrame], payload: Dict) -> Tuple[float, int]:
+    tracemalloc.start()
+    started = perf_counter()
+    frame = path(payload)
+    seconds = perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(frame) == sum(len(bars) for bars in payload.values())
+    return seconds, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--minutes", type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    payload = synthetic_payload(args.symbols, args.minutes)
+    bars = args.symbols * args.minutes
+
+    print(f"{'path':<8} {'seconds':>8} {'bars/s':>12} {'peak MiB':>9}")
+    for name, path in (("dicts", dicts_path), ("columns", columns_path)):
+        seconds, peak = measure(path, payload)
+        print(f"{name:<8} {seconds:>8.2f} {bars / seconds:>12,.0f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the article parsing step over a corpus of saved HTML pages.
+
+Compares the old double parse (extract() + extract_metadata() on the same string) with the
+single parse done by core.article_parser.parse_article().
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.bench_article_parsing path/to/html_dir [--repeat 3]
+"""
+
+from pathlib import Path
+from time import perf_counter
+from trafilatura import extract, extract_metadata
+from typing import Callable, List
+
+from core.article_parser import parse_article
+
+import argparse
+import statistics
+
+
+def double_parse(html: str) -> None:
+    extract(html)
+    extract_metadata(html)
+
+
+def single_parse(html: str) -> None:
+    parse_article(html)
+
+
+def time_page(parse: Callable[[str], None], html: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        parse(html)
+        timings.append(perf_counter() - started)
+
+    return min(timings)
+
+
+def load_corpus(directory: Path) -> List[Path]:
+    pages = sorted(p for p in directory.iterdir() if p.suffix in (".html", ".htm"))
+    if not pages:
+        raise SystemExit(f"No .html files found in {directory}")
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="Directory with saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page, the fastest one is kept")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    speedups = []
+    total_double = total_single = 0.0
+
+    print(f"{'page':<40} {'double ms':>10} {'single ms':>10} {'speedup':>8}")
+    for page in pages:
+        html = page.read_text(encoding="utf-8", errors="replace")
+
+        double_seconds = time_page(double_parse, html, args.repeat)
+        single_seconds = time_page(single_parse, html, args.repeat)
+
+        total_double += double_seconds
+        total_single += single_seconds
+        speedup = double_seconds / single_seconds if single_seconds else 0.0
+        speedups.append(speedup)
+
+        print(f"{page.name[:40]:<40} {double_seconds * 1000:>10.2f} {single_seconds * 1000:>10.2f} {speedup:>7.2f}x")
+
+    print()
+    print(f"pages:          {len(pages)}")
+    print(f"double parse:   {total_double * 1000 / len(pages):.2f} ms/page")
+    print(f"single parse:   {total_single * 1000 / len(pages):.2f} ms/page")
+    print(f"median speedup: {statistics.median(speedups):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Throughput vs. quality of the article extraction modes over a corpus of saved HTML pages.
+
+Every page is extracted in the 'fast', 'tiered' and 'full' modes of
+core.article_parser.parse_article(). The full extraction serves as the reference, the
+quality of the other modes is the share of its words they recover (recall) and how many
+pages they return empty.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.bench_extraction_modes path/to/html_dir [--min-fast-length 500]
+"""
+
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from core.article_parser import EXTRACTION_MODES, parse_article
+
+import argparse
+import statistics
+
+
+def word_recall(text: Optional[str], reference: Optional[str]) -> float:
+    reference_words = set((reference or "").split())
+    if not reference_words:
+        return 1.0
+
+    return len(reference_words & set((text or "").split())) / len(reference_words)
+
+
+def load_corpus(directory: Path) -> List[Path]:
+    pages = sorted(p for p in directory.iterdir() if p.suffix in (".html", ".htm"))
+    if not pages:
+        raise SystemExit(f"No .html files found in {directory}")
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="Directory with saved .html pages")
+    parser.add_argument("--min-fast-length", type=int, default=500, help="Escalation threshold of the tiered mode")
+    args = parser.parse_args()
+
+    pages = [page.read_bytes() for page in load_corpus(args.corpus)]
+
+    seconds: Dict[str, float] = {mode: 0.0 for mode in EXTRACTION_MODES}
+    texts: Dict[str, List[Optional[str]]] = {mode: [] for mode in EXTRACTION_MODES}
+    escalated = 0
+
+    for html in pages:
+        for mode in EXTRACTION_MODES:
+            started = perf_counter()
+            parsed = parse_article(html, mode=mode, min_fast_length=args.min_fast_length)
+            seconds[mode] += perf_counter() - started
+
+            texts[mode].append(parsed["content"])
+            if parsed["tier"] == "escalated":
+                escalated += 1
+
+    print(f"{'mode':<8} {'pages/s':>8} {'ms/page':>8} {'empty':>6} {'median recall':>14} {'mean recall':>12}")
+    for mode in EXTRACTION_MODES:
+        recalls = [word_recall(text, reference) for text, reference in zip(texts[mode], texts["full"])]
+        empty = sum(1 for text in texts[mode] if not text)
+
+        print(
+            f"{mode:<8} {len(pages) / seconds[mode]:>8.1f} {seconds[mode] * 1000 / len(pages):>8.2f} "
+            f"{empty:>6} {statistics.median(recalls):>14.3f} {statistics.mean(recalls):>12.3f}"
+        )
+
+    print()
+    print(f"pages:     {len(pages)}")
+    print(f"escalated: {escalated} ({escalated / len(pages):.1%}) of the tiered extractions")
+
+
+if __name__ == "__main__":
+    main()
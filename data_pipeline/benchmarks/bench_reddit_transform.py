@@ -0,0 +1,159 @@
+"""
+Memory benchmark of the Reddit transformation at growing sizes.
+
+Compares the previous chain of whole-frame steps (rename, drop_duplicates, dropna, fillna,
+mask filter, block astype) with the current transform_praw_data(). Every run happens in a
+fresh process, so the peak resident memory (ru_maxrss) of one run doesn't hide the other's.
+At the smallest size both outputs are compared for equality first.
+
+The data profiling at the end of transform_praw_data() (and its Prefect table artifact) is
+replaced with a no-op, so both paths measure only the transform.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.bench_reddit_transform [--sizes 10000 100000 1000000] [--body-chars 3000]
+"""
+
+from multiprocessing import get_context
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+from time import perf_counter
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+from core.identifiers import article_id_column, reddit_post_id_column
+from core.text_cleaning import clean_text_column
+from tasks.transformation import REDDIT_STRING_COLUMNS, peak_rss_mib, transform_praw_data
+
+import argparse
+import pandas as pd
+import random
+
+
+def synthetic_posts(count: int, body_chars: int) -> List[Dict]:
+    random.seed(count)
+    words = ["market", "stocks", "earnings", "fed", "rates", "ai", "chips", "growth", "<b>", "http://x.co/a", "!"]
+
+    def text(length: int) -> str:
+        return " ".join(random.choice(words) for _ in range(length // 6))
+
+    posts = []
+    for index in range(count):
+        is_text_post = random.random() < 0.4
+        has_article = not is_text_post and random.random() < 0.8
+        posts.append({
+            "reddit_id": f"t3_{index % int(count * 0.95) + 1:x}",
+            "subreddit": random.choice(["stocks", "news", "technology", None if index % 97 == 0 else "FinanceNews"]),
+            "author": f"user{index % 5000}",
+            "title": text(80),
+            "selftext": text(400) if is_text_post else None,
+            "score": random.randint(0, 10000),
+            "num_comments": random.randint(0, 500),
+            "is_text_post": is_text_post,
+            "link_flair_text": random.choice(["News", None]),
+            "upvote_ratio": random.random(),
+            "published_at": 1_735_000_000 + index,
+            "permalink": f"/r/stocks/comments/{index % int(count * 0.95) + 1:x}/",
+            "url": f"https://news.example.com/{index}?utm_source=reddit",
+            "article_headline": text(80) if has_article else None,
+            "article_author": "Jane Doe" if has_article else None,
+            "article_publisher": "Example News" if has_article else None,
+            "article_content": text(body_chars) if has_article else None,
+            "article_published_at": "2025-01-01T10:00:00+00:00" if has_article else None,
+            "article_category": ["markets", "economy"] if has_article else None,
+        })
+
+    return posts
+
+
+def chained_transform(data: List[Dict]) -> DataFrame:
+    """
+    The previous implementation, one whole-frame copy per step.
+    """
+    data_frame = DataFrame(data).rename(
+        columns={
+            "selftext": "body_text",
+            "num_comments": "number_of_comments",
+            "link_flair_text": "subreddit_category",
+            "permalink": "reddit_post_url",
+            "url": "article_url",
+        }
+    )
+    data_frame["article_category"] = data_frame["article_category"].apply(
+        lambda x: ", ".join(x) if isinstance(x, list) else x
+    )
+    data_frame = data_frame.drop_duplicates(subset=["reddit_id", "reddit_post_url"], keep="first")
+    data_frame = data_frame.dropna(subset=["reddit_id", "subreddit", "published_at"], how="any")
+    data_frame = data_frame.fillna(
+        {
+            "body_text": "No text",
+            "content": "No text",
+            "subreddit_category": "No category",
+            "score": 0,
+            "number_of_comments": 0,
+            "upvote_ratio": 0.5,
+            "article_author": "Unknown Author",
+            "article_publisher": "Unknown Publisher",
+            "article_headline": "No Title",
+            "article_content": "No Content",
+        }
+    )
+    data_frame = data_frame[~((data_frame["is_text_post"] == False) & (data_frame["article_published_at"].isna() | data_frame["article_published_at"].eq("")))]
+    data_frame["article_headline_cleaned"] = clean_text_column(data_frame["article_headline"])
+    data_frame["article_content_cleaned"] = clean_text_column(data_frame["article_content"])
+    data_frame["id"] = reddit_post_id_column(data_frame["reddit_id"])
+    data_frame["article_id"] = article_id_column(data_frame["article_url"])
+    data_frame["published_at"] = pd.to_datetime(data_frame["published_at"], unit="s", utc=True)
+    data_frame["published_at"] = data_frame["published_at"].astype("datetime64[s, UTC]")
+    data_frame["article_published_at"] = pd.to_datetime(data_frame["article_published_at"], utc=True)
+    data_frame["article_published_at"] = data_frame["article_published_at"].astype("datetime64[s, UTC]")
+    data_frame[["score", "number_of_comments"]] = data_frame[["score", "number_of_comments"]].astype(int)
+    data_frame[REDDIT_STRING_COLUMNS] = data_frame[REDDIT_STRING_COLUMNS].astype(str)
+    return data_frame
+
+
+def transform_without_profile(data: List[Dict]) -> DataFrame:
+    with patch("tasks.transformation.profile_data"):
+        return transform_praw_data.fn(data)
+
+
+def run(args: Tuple[str, int, int]) -> Tuple[float, float]:
+    """
+    Runs one transform in the current (fresh) process, returns its wall time and how much
+    it raised the peak memory above the input's.
+    """
+    name, count, body_chars = args
+    data = synthetic_posts(count, body_chars)
+    baseline = peak_rss_mib()
+
+    started = perf_counter()
+    if name == "chained":
+        chained_transform(data)
+    else:
+        transform_without_profile(data)
+
+    return perf_counter() - started, peak_rss_mib() - baseline
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--body-chars", type=int, default=3000, help="Length of the article bodies")
+    args = parser.parse_args()
+
+    sample = synthetic_posts(min(args.sizes), args.body_chars)
+    expected = chained_transform(sample)
+    actual = transform_without_profile(sample)
+    assert_frame_equal(actual[expected.columns], expected)
+    print("parity: outputs are equal")
+
+    context = get_context("spawn")
+    print(f"{'posts':>10} {'path':<9} {'seconds':>8} {'peak +MiB':>10}")
+    for count in args.sizes:
+        for name in ("chained", "current"):
+            with context.Pool(1) as pool:
+                seconds, peak = pool.apply(run, ((name, count, args.body_chars),))
+            print(f"{count:>10} {name:<9} {seconds:>8.2f} {peak:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Rows per second of the stock bar load paths against a real (local TimescaleDB) database: the
+ORM unit of work (StockBarService.create_many), batched INSERT ... ON CONFLICT DO NOTHING
+(StockBarService.insert_many) and COPY into a staging table merged with INSERT ... ON CONFLICT
+(StockBarService.copy_many).
+
+The bars are synthetic minute bars of an existing company, dated in 1990 so they can't collide
+with real data, and they are deleted again at the end. The database is the one of DATABASE_URL.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.bench_stock_bar_load --ticker AAPL [--rows 100000]
+"""
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from time import perf_counter
+from typing import List, Tuple
+
+from core.database import get_db
+from core.identifiers import stock_bar_id
+from models import StockBar
+from services import CompanyService, StockBarService
+from services.stock_bar_service import COPY_COLUMNS
+
+import argparse
+import random
+import uuid
+
+BENCHMARK_START = datetime(1990, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_rows(company_id, ticker: str, count: int, start: datetime) -> List[Tuple]:
+    rows = []
+    price = 100.0
+    for minute in range(count):
+        timestamp = start + timedelta(minutes=minute)
+        price *= random.uniform(0.999, 1.001)
+        rows.append((
+            str(stock_bar_id(ticker, timestamp)),
+            company_id,
+            timestamp,
+            round(price, 4),
+            round(price * 1.001, 4),
+            round(price * 0.999, 4),
+            round(price, 4),
+            random.randint(100, 100_000),
+            random.randint(1, 500),
+            round(price, 4),
+        ))
+    return rows
+
+
+def stock_bar_from_row(row: Tuple) -> StockBar:
+    bar_id, company_id, timestamp, open_price, high_price, low_price, close_price, volume, trade_count, vwap = row
+    return StockBar(
+        id=uuid.UUID(bar_id),
+        company_id=company_id,
+        timestamp=timestamp,
+        open_price=open_price,
+        high_price=high_price,
+        low_price=low_price,
+        close_price=close_price,
+        volume=volume,
+        trade_count=trade_count,
+        vwap=vwap,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticker", required=True, help="Ticker of a company that exists in the database")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with get_db() as session:
+        company_id = CompanyService.get_ids_by_tickers(session, [args.ticker]).get(args.ticker)
+    if not company_id:
+        raise SystemExit(f"No company with the ticker {args.ticker}")
+
+    random.seed(0)
+    # Every path loads bars of another year, so each one inserts all of its rows
+    orm_rows = synthetic_rows(company_id, args.ticker, args.rows, BENCHMARK_START)
+    insert_rows = [
+        dict(zip(COPY_COLUMNS, (uuid.UUID(row[0]), *row[1:])))
+        for row in synthetic_rows(company_id, args.ticker, args.rows, BENCHMARK_START + timedelta(days=366))
+    ]
+    copy_rows = synthetic_rows(company_id, args.ticker, args.rows, BENCHMARK_START + timedelta(days=2 * 366))
+
+    try:
+        with get_db() as session:
+            started = perf_counter()
+            StockBarService.create_many(session, [stock_bar_from_row(row) for row in orm_rows])
+            session.commit()
+            orm_seconds = perf_counter() - started
+
+        with get_db() as session:
+            started = perf_counter()
+            insert_inserted = StockBarService.insert_many(session, insert_rows, 1000)
+            session.commit()
+            insert_seconds = perf_counter() - started
+
+        with get_db() as session:
+            started = perf_counter()
+            inserted = StockBarService.copy_many(session, copy_rows)
+            session.commit()
+            copy_seconds = perf_counter() - started
+
+        with get_db() as session:
+            started = perf_counter()
+            skipped = StockBarService.copy_many(session, copy_rows)
+            session.commit()
+            rerun_seconds = perf_counter() - started
+    finally:
+        with get_db() as session:
+            session.execute(
+                delete(StockBar).where(
+                    StockBar.company_id == company_id,
+                    StockBar.timestamp < BENCHMARK_START + timedelta(days=4 * 366),
+                )
+            )
+            session.commit()
+
+    print(f"rows:                 {args.rows}")
+    print(f"orm:                  {orm_seconds:.2f}s ({args.rows / orm_seconds:,.0f} rows/s)")
+    print(f"insert:               {insert_seconds:.2f}s ({args.rows / insert_seconds:,.0f} rows/s), {insert_inserted} inserted")
+    print(f"copy:                 {copy_seconds:.2f}s ({args.rows / copy_seconds:,.0f} rows/s), {inserted} inserted")
+    print(f"copy, already loaded: {rerun_seconds:.2f}s ({args.rows / rerun_seconds:,.0f} rows/s), {skipped} inserted")
+    print(f"speedup:              {orm_seconds / copy_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
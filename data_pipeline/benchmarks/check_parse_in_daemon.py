@@ -0,0 +1,86 @@
+"""
+Checks that core.article_parser.parse_article_in_pool still parses pages when it runs inside a
+daemonic process, the way it does in a child of Celery's default prefork pool, which isn't
+allowed to start the parsing process pool. The page is parsed in a daemonic
+multiprocessing.Process and, when billiard (Celery's fork of multiprocessing) is installed, in
+a daemonic billiard.Process too. Any failed check is printed and the script exits with status 1.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.check_parse_in_daemon [--workers 2]
+"""
+
+from typing import Any, Callable, List, Tuple
+
+from core.article_parser import parse_article_in_pool
+
+import argparse
+import asyncio
+import multiprocessing
+import sys
+
+PAGE = """
+<html>
+  <head><title>Markets rally as inflation cools</title></head>
+  <body>
+    <article>
+      <h1>Markets rally as inflation cools</h1>
+      <p>Stocks climbed on Tuesday after a report showed consumer prices rose less than
+      economists had expected, reviving hopes that the central bank could start cutting
+      interest rates before the end of the year.</p>
+      <p>The benchmark index gained 1.2 percent, led by technology and consumer shares, while
+      Treasury yields fell to their lowest level in three months as traders repriced the path
+      of monetary policy over the coming quarters.</p>
+      <p>Analysts cautioned that a single month of data rarely settles the debate, and that
+      the labour market would weigh just as heavily on the next decision.</p>
+    </article>
+  </body>
+</html>
+"""
+
+
+def parse_in_child(workers: int, results: Any) -> None:
+    try:
+        article = asyncio.run(parse_article_in_pool(PAGE, workers, mode="full"))
+        results.put(("ok", article.get("content") or ""))
+    except BaseException as e:
+        results.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def run_daemonic(process_class: Callable, queue_class: Callable, workers: int) -> Tuple[str, str]:
+    results = queue_class()
+    process = process_class(target=parse_in_child, args=(workers, results), daemon=True)
+    process.start()
+    outcome = results.get(timeout=120)
+    process.join(timeout=30)
+    return outcome
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="parse_pool_workers to ask for")
+    args = parser.parse_args()
+
+    runs: List[Tuple[str, Callable, Callable]] = [
+        ("multiprocessing", multiprocessing.Process, multiprocessing.Queue),
+    ]
+    try:
+        import billiard
+        runs.append(("billiard", billiard.Process, billiard.Queue))
+    except ImportError:
+        print("skip billiard is not installed")
+
+    failed = 0
+    for name, process_class, queue_class in runs:
+        status, detail = run_daemonic(process_class, queue_class, args.workers)
+        passed = status == "ok" and "inflation" in detail
+        print(f"{'ok  ' if passed else 'FAIL'} a daemonic {name} process parses the page"
+              + ("" if passed else f": {detail[:200]}"))
+        failed += not passed
+
+    if failed:
+        print(f"{failed} checks failed.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Checks core.reddit_client.AsyncRedditClient against the local fake Reddit API
+(benchmarks.fake_reddit_server): listing paging, a single token request shared by concurrent
+subreddits, re-authentication after a revoked token, waiting out a 429, and giving up on
+credentials that keep being rejected or on a rate limit that never lifts. Any failed check is
+printed and the script exits with status 1.
+
+The rate limiter runs with the 'local' backend, no database is needed.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.check_reddit_client
+"""
+
+from typing import Callable, List, Tuple
+
+from benchmarks.fake_reddit_server import FakeReddit, start_fake_reddit
+from core.config_loader import settings
+from core.reddit_client import MAX_RATE_LIMITED_RETRIES, AsyncRedditClient, RedditAPIError
+
+import asyncio
+import httpx
+import sys
+
+SUBREDDITS = ["stocks", "investing", "wallstreetbets"]
+
+
+async def read_listings(fake: FakeReddit, limit: int, subreddits: List[str] = SUBREDDITS) -> List[List[dict]]:
+    server = start_fake_reddit(fake)
+    url = f"http://127.0.0.1:{server.server_port}"
+    settings.reddit_auth_url = url
+    settings.reddit_api_base_url = url
+
+    async def read(client: AsyncRedditClient, subreddit: str) -> List[dict]:
+        posts = []
+        async for page in client.iter_listing(subreddit, None, limit):
+            posts.extend(page)
+        return posts
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as http:
+            client = AsyncRedditClient(http)
+            return await asyncio.gather(*(read(client, subreddit) for subreddit in subreddits))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def raises_api_error(fake: FakeReddit) -> bool:
+    try:
+        asyncio.run(read_listings(fake, 50))
+    except RedditAPIError:
+        return True
+    return False
+
+
+def check_paging() -> List[Tuple[str, bool]]:
+    fake = FakeReddit(posts_per_subreddit=250)
+    listings = asyncio.run(read_listings(fake, 230))
+    ids = [[post["id"] for post in posts] for posts in listings]
+    return [
+        ("every subreddit returns the requested number of posts", all(len(i) == 230 for i in ids)),
+        ("no post is returned twice", all(len(set(i)) == len(i) for i in ids)),
+        ("posts come newest first", all(
+            [p["created_utc"] for p in posts] == sorted((p["created_utc"] for p in posts), reverse=True)
+            for posts in listings
+        )),
+        ("three pages per subreddit", fake.pages_served == 3 * len(SUBREDDITS)),
+        ("concurrent subreddits share one token request", fake.token_requests == 1),
+    ]
+
+
+def check_reauthentication() -> List[Tuple[str, bool]]:
+    # A single subreddit, concurrent readers could see the new token revoked before using it
+    fake = FakeReddit(posts_per_subreddit=300, expire_token_every=2)
+    listings = asyncio.run(read_listings(fake, 300, SUBREDDITS[:1]))
+    return [
+        ("a revoked token is replaced and the listing completes", len(listings[0]) == 300),
+        ("the revoked token was hit", fake.unauthorized == 1),
+        ("one token request per revocation", fake.token_requests == 2),
+    ]
+
+
+def check_rate_limit() -> List[Tuple[str, bool]]:
+    fake = FakeReddit(posts_per_subreddit=300, rate_limit_every=3)
+    listings = asyncio.run(read_listings(fake, 300))
+    return [
+        ("429 answers are waited out and the listing completes", all(len(posts) == 300 for posts in listings)),
+        ("the rate limit was hit", fake.rate_limited > 0),
+    ]
+
+
+def check_giving_up() -> List[Tuple[str, bool]]:
+    rejected = FakeReddit(reject_tokens=True)
+    rate_limited = FakeReddit(rate_limit_always=True)
+    return [
+        ("rejected credentials raise RedditAPIError", raises_api_error(rejected)),
+        ("a rejected request re-authenticates once", rejected.listing_requests <= 2 * len(SUBREDDITS)),
+        ("a rate limit that never lifts raises RedditAPIError", raises_api_error(rate_limited)),
+        (
+            "a rate limited request is retried a bounded number of times",
+            rate_limited.listing_requests <= (MAX_RATE_LIMITED_RETRIES + 1) * len(SUBREDDITS),
+        ),
+    ]
+
+
+def main() -> None:
+    settings.rate_limit_backend = "local"
+    settings.rate_limit_reddit_per_second = 1000
+    settings.rate_limit_reddit_burst = 1000
+
+    checks: List[Callable[[], List[Tuple[str, bool]]]] = [
+        check_paging,
+        check_reauthentication,
+        check_rate_limit,
+        check_giving_up,
+    ]
+
+    failed = 0
+    for check in checks:
+        for name, passed in check():
+            print(f"{'ok  ' if passed else 'FAIL'} {name}")
+            failed += not passed
+
+    if failed:
+        print(f"{failed} checks failed.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Local fake of the Reddit OAuth endpoints used by core.reddit_client: the password grant token
+endpoint and the subreddit 'new' and 'search' listings, paged with the 'after' cursor.
+
+Failures can be scripted, so the client's re-authentication and rate limit handling can be
+exercised without touching Reddit:
+
+- expire_token_every: every Nth listing request answers 401 and revokes the current token
+- reject_tokens: every listing request answers 401
+- rate_limit_every: every Nth listing request answers 429 with a Retry-After of retry_after
+- rate_limit_always: every listing request answers 429
+
+Point the pipeline at it with REDDIT_AUTH_URL and REDDIT_API_BASE_URL set to the printed URL.
+
+Usage (from the data_pipeline directory):
+    python -m benchmarks.fake_reddit_server [--port 8765] [--posts 500]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import argparse
+import json
+import re
+
+LISTING_PATH = re.compile(r"^/r/(?P<subreddit>[^/]+)/(?P<listing>new|search)$")
+BASE_CREATED_UTC = 1_700_000_000
+
+
+def fake_post(subreddit: str, number: int) -> Dict[str, Any]:
+    post_id = f"{subreddit[:3].lower()}{number:05d}"
+    is_self = number % 3 == 0
+    return {
+        "id": post_id,
+        "subreddit": subreddit,
+        "author": f"user{number % 17}",
+        "title": f"Post {number} of r/{subreddit}",
+        "selftext": f"Body of post {number}" if is_self else "",
+        "score": number * 7 % 1000,
+        "num_comments": number % 50,
+        "is_self": is_self,
+        "url": f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/" if is_self else f"https://news.example.com/{post_id}",
+        "link_flair_text": "News",
+        "upvote_ratio": 0.9,
+        "permalink": f"/r/{subreddit}/comments/{post_id}/",
+        "created_utc": BASE_CREATED_UTC - number * 60,
+    }
+
+
+class FakeReddit:
+    def __init__(
+        self,
+        posts_per_subreddit: int = 500,
+        expire_token_every: int = 0,
+        reject_tokens: bool = False,
+        rate_limit_every: int = 0,
+        rate_limit_always: bool = False,
+        retry_after: float = 0.0,
+    ):
+        self.posts_per_subreddit = posts_per_subreddit
+        self.expire_token_every = expire_token_every
+        self.reject_tokens = reject_tokens
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_always = rate_limit_always
+        self.retry_after = retry_after
+
+        self.token_requests = 0
+        self.listing_requests = 0
+        self.unauthorized = 0
+        self.rate_limited = 0
+        self.pages_served = 0
+
+        self._lock = Lock()
+        self._token: Optional[str] = None
+
+    def issue_token(self) -> str:
+        with self._lock:
+            self.token_requests += 1
+            self._token = f"token-{self.token_requests}"
+            return self._token
+
+    def listing(self, authorization: str, subreddit: str, query: Dict[str, List[str]]) -> tuple:
+        """
+        Returns (status, headers, body) of a listing request.
+        """
+        with self._lock:
+            self.listing_requests += 1
+            number = self.listing_requests
+
+            if self.rate_limit_always or (self.rate_limit_every and number % self.rate_limit_every == 0):
+                self.rate_limited += 1
+                return 429, {"Retry-After": str(self.retry_after)}, {"message": "Too Many Requests"}
+
+            token_is_valid = self._token is not None and authorization == f"bearer {self._token}"
+            if self.expire_token_every and number % self.expire_token_every == 0:
+                self._token = None
+            if self.reject_tokens or not token_is_valid:
+                self.unauthorized += 1
+                return 401, {}, {"message": "Unauthorized"}
+
+            self.pages_served += 1
+
+        limit = min(int(query.get("limit", ["25"])[0]), 100)
+        after = query.get("after", [None])[0]
+
+        posts = [fake_post(subreddit, number) for number in range(self.posts_per_subreddit)]
+        start = 0
+        if after:
+            ids = [f"t3_{post['id']}" for post in posts]
+            start = ids.index(after) + 1 if after in ids else len(posts)
+
+        page = posts[start:start + limit]
+        next_after = f"t3_{page[-1]['id']}" if page and start + limit < len(posts) else None
+
+        return 200, {}, {
+            "kind": "Listing",
+            "data": {
+                "after": next_after,
+                "children": [{"kind": "t3", "data": post} for post in page],
+            },
+        }
+
+
+def make_handler(fake: FakeReddit):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, headers: Dict[str, str], body: Dict[str, Any]) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if urlsplit(self.path).path != "/api/v1/access_token":
+                return self._send(404, {}, {"message": "Not Found"})
+
+            self._send(200, {}, {"access_token": fake.issue_token(), "token_type": "bearer", "expires_in": 86400})
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            match = LISTING_PATH.match(parts.path)
+            if not match:
+                return self._send(404, {}, {"message": "Not Found"})
+
+            self._send(*fake.listing(
+                self.headers.get("Authorization", ""),
+                match.group("subreddit"),
+                parse_qs(parts.query),
+            ))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_reddit(fake: FakeReddit, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serves the fake in a background thread, the URL is http://127.0.0.1:<server.server_port>.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fake))
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=500, help="Posts served per subreddit")
+    parser.add_argument("--expire-token-every", type=int, default=0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    fake = FakeReddit(
+        posts_per_subreddit=args.posts,
+        expire_token_every=args.expire_token_every,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(fake))
+    print(f"Fake Reddit API listening on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from core.config_loader import settings
+from core.database import dispose_inherited_engine, pool_stats
 
 app = Celery("data_task",
              broker=settings.celery_broker_url,
@@ -11,6 +13,18 @@ app.conf.update(
     result_expires=3600,
 )
 
+
+@worker_process_init.connect
+def reset_database_pool(**kwargs):
+    # The prefork child must not reuse the connections it inherited from the parent.
+    dispose_inherited_engine()
+
+
+@worker_process_shutdown.connect
+def report_database_pool(**kwargs):
+    pool_stats.report()
+
+
 if __name__ == "__main__":
     app.start()
 
@@ -0,0 +1,182 @@
+"""
+CPU-bound article parsing, kept apart from the async download code so it can be shipped to
+a process pool instead of blocking the worker's event loop.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from trafilatura import bare_extraction
+from trafilatura.utils import normalize_unicode
+from trafilatura.xml import xmltotxt
+from typing import Any, Dict, Optional, Union
+
+import asyncio
+import multiprocessing
+import os
+
+_executor: Optional[Executor] = None
+_executor_pid: Optional[int] = None
+
+
+# 'fast' skips trafilatura's fallback extractors, 'full' always runs them and 'tiered' only
+# runs them again when the fast pass came back empty or too short.
+EXTRACTION_MODES = ("fast", "full", "tiered")
+
+
+def parse_article(
+    html: Union[str, bytes],
+    with_metadata: bool = True,
+    mode: str = "full",
+    min_fast_length: int = 0,
+) -> Dict[str, Any]:
+    """
+    Extracts the article body (and optionally its metadata) from a HTML page. Raw bytes are
+    accepted too, trafilatura then detects the page's encoding itself.
+
+    The page is parsed into a DOM only once per pass, the body and the metadata are both read
+    from the same tree by bare_extraction() instead of calling extract() and extract_metadata()
+    on the raw string. In 'tiered' mode a fast pass shorter than min_fast_length characters is
+    escalated to a full one.
+
+    It runs inside the pool processes, so it has to stay a module level function
+    and only return picklable values.
+    """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}")
+
+    started = perf_counter()
+
+    document = bare_extraction(html, with_metadata=with_metadata, fast=mode != "full")
+    content = document_text(document)
+    tier = "full" if mode == "full" else "fast"
+
+    if mode == "tiered" and len(content or "") < min_fast_length:
+        document = bare_extraction(html, with_metadata=with_metadata)
+        content = document_text(document)
+        tier = "escalated"
+
+    return {
+        "content": content,
+        "title": getattr(document, "title", None),
+        "author": getattr(document, "author", None),
+        "sitename": getattr(document, "sitename", None),
+        "date": getattr(document, "date", None),
+        "categories": getattr(document, "categories", None),
+        "has_metadata": document is not None and with_metadata,
+        "tier": tier,
+        "parse_seconds": perf_counter() - started,
+    }
+
+
+def serves_mode(parsed: Dict[str, Any], mode: str, min_fast_length: int = 0) -> bool:
+    """
+    Whether an earlier extraction is as good as what mode would produce now, e.g. when it
+    comes from the cache. A full (or escalated) one serves every mode. A fast one serves
+    'fast', and 'tiered' only when it's long enough not to have been escalated. Entries
+    cached before the tiers existed were full extractions.
+    """
+    if parsed.get("tier", "full") != "fast":
+        return True
+    if mode == "tiered":
+        return len(parsed.get("content") or "") >= min_fast_length
+    return mode == "fast"
+
+
+def document_text(document: Any) -> Optional[str]:
+    """
+    Renders the extracted body the way trafilatura.extract() does for its default 'txt'
+    output, i.e. the main text followed by the comments.
+    """
+    if document is None or document.body is None:
+        return None
+
+    text = xmltotxt(document.body, False)
+    if document.commentsbody is not None:
+        text = f"{text}\n{xmltotxt(document.commentsbody, False)}".strip()
+
+    return normalize_unicode(text)
+
+
+def can_start_processes() -> bool:
+    """
+    Daemonic processes, like the children of Celery's default prefork pool, aren't allowed to
+    have children of their own.
+    """
+    if multiprocessing.current_process().daemon:
+        return False
+
+    try:
+        import billiard
+    except ImportError:
+        return True
+
+    return not billiard.current_process().daemon
+
+
+def thread_parse_executor() -> Executor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="article-parser")
+
+
+def get_parse_executor(max_workers: int) -> Executor:
+    """
+    Returns the parsing pool of the current process, created on first use so Celery's
+    prefork children each get their own instead of inheriting the parent's.
+
+    With max_workers set to 0, inside a daemonic process (a prefork child), or when the
+    platform refuses to start child processes, parsing falls back to a thread, which at least
+    keeps the event loop responsive.
+    """
+    global _executor, _executor_pid
+
+    if _executor is not None and _executor_pid == os.getpid():
+        return _executor
+
+    _executor_pid = os.getpid()
+
+    if max_workers > 0:
+        if not can_start_processes():
+            print("  -> [Worker] Running in a daemonic process, parsing in a thread instead of a process pool.")
+        else:
+            try:
+                _executor = ProcessPoolExecutor(max_workers=max_workers)
+                return _executor
+            except (OSError, AssertionError) as e:
+                print(f"  -> [Worker] Could not start the parsing process pool, falling back to a thread: {e}")
+
+    _executor = thread_parse_executor()
+    return _executor
+
+
+async def parse_article_in_pool(
+    html: Union[str, bytes],
+    max_workers: int,
+    with_metadata: bool = True,
+    mode: str = "full",
+    min_fast_length: int = 0,
+) -> Dict[str, Any]:
+    global _executor
+
+    loop = asyncio.get_running_loop()
+    executor = get_parse_executor(max_workers)
+
+    try:
+        return await loop.run_in_executor(
+            executor, parse_article, html, with_metadata, mode, min_fast_length
+        )
+    except AssertionError as e:
+        # The pool only starts its children on the first submit, a process that can't have
+        # any fails there. Parse in a thread from now on, this page included.
+        if not isinstance(executor, ProcessPoolExecutor) or "daemonic" not in str(e):
+            raise
+        print(f"  -> [Worker] The parsing process pool can't start, falling back to a thread: {e}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _executor = thread_parse_executor()
+        return await loop.run_in_executor(
+            _executor, parse_article, html, with_metadata, mode, min_fast_length
+        )
+    except BrokenProcessPool:
+        # A crashed child (e.g. killed for memory) breaks the whole pool, start a new one
+        # for the following pages and let this page count as failed.
+        _executor = None
+        raise
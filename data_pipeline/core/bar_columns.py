@@ -0,0 +1,116 @@
+"""
+Columnar representation of Alpaca minute bars.
+
+A run over many tickers returns millions of bars. Building a pydantic Bar model, then a dict
+per bar, then a DataFrame out of those dicts costs several Python objects per bar. Instead the
+raw API payload is read straight into one list per column, which travels through Celery as is
+and becomes a DataFrame without any per-row object.
+"""
+
+from datetime import datetime
+from operator import itemgetter
+from pandas import DataFrame
+from typing import Any, Dict, Iterable, List, Set
+
+import numpy as np
+import pandas as pd
+
+# Column name -> key of the field in Alpaca's raw bar payload
+RAW_BAR_FIELDS = {
+    "timestamp": "t",
+    "open": "o",
+    "high": "h",
+    "low": "l",
+    "close": "c",
+    "volume": "v",
+    "trade_count": "n",
+    "vwap": "vw",
+}
+
+BAR_COLUMNS = ("symbol", *RAW_BAR_FIELDS)
+
+BarColumns = Dict[str, List[Any]]
+
+
+def empty_bar_columns() -> BarColumns:
+    return {column: [] for column in BAR_COLUMNS}
+
+
+def bar_columns_from_raw(raw_bars: Dict[str, List[Dict[str, Any]]]) -> BarColumns:
+    """
+    Turns the {symbol: [raw bar, ...]} payload returned by the SDK with raw_data=True into
+    columns. Timestamps stay RFC 3339 strings, they are parsed in one vectorized pass during
+    the transformation.
+    """
+    columns = empty_bar_columns()
+
+    for symbol, bars in raw_bars.items():
+        if not bars:
+            continue
+
+        columns["symbol"].extend([symbol] * len(bars))
+        for column, field in RAW_BAR_FIELDS.items():
+            try:
+                values = list(map(itemgetter(field), bars))
+            except KeyError:
+                # Some bars lack trade_count or vwap, those become nulls
+                values = [bar.get(field) for bar in bars]
+            columns[column].extend(values)
+
+    return columns
+
+
+def concat_bar_columns(parts: Iterable[BarColumns]) -> BarColumns:
+    columns = empty_bar_columns()
+    for part in parts:
+        for column in BAR_COLUMNS:
+            columns[column].extend(part[column])
+
+    return columns
+
+
+def drop_symbols(columns: BarColumns, symbols: Set[str]) -> BarColumns:
+    if not symbols:
+        return columns
+
+    keep = [index for index, symbol in enumerate(columns["symbol"]) if symbol not in symbols]
+    return {column: [values[index] for index in keep] for column, values in columns.items()}
+
+
+def drop_bars_before(columns: BarColumns, starts: Dict[str, datetime]) -> BarColumns:
+    """
+    Drops the bars of each symbol in starts timestamped before its start, the other symbols
+    are kept as they are. Only the timestamps of those symbols are parsed.
+    """
+    if not starts:
+        return columns
+
+    keep = [
+        index
+        for index, (symbol, timestamp) in enumerate(zip(columns["symbol"], columns["timestamp"]))
+        if symbol not in starts or datetime.fromisoformat(timestamp) >= starts[symbol]
+    ]
+    if len(keep) == bar_count(columns):
+        return columns
+
+    return {column: [values[index] for index in keep] for column, values in columns.items()}
+
+
+def bar_count(columns: BarColumns) -> int:
+    return len(columns["symbol"]) if columns else 0
+
+
+def bar_columns_frame(columns: BarColumns) -> DataFrame:
+    """
+    Builds the data frame one array at a time, the prices and counts go straight into float64
+    arrays and the symbols into a categorical.
+    """
+    return DataFrame({
+        "symbol": pd.Categorical(columns["symbol"]),
+        "timestamp": columns["timestamp"],
+        **{
+            column: np.asarray(columns[column], dtype="float64")
+            for column in RAW_BAR_FIELDS
+            if column != "timestamp"
+        },
+    })
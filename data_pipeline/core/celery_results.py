@@ -0,0 +1,77 @@
+"""
+Collects the results of a Celery group (or any set of task results) chunk by chunk as they
+finish, instead of a single GroupResult.get() that throws away every finished chunk as soon as
+one of them times out.
+"""
+
+from time import monotonic, sleep
+from typing import Any, Dict, Iterator, List, Tuple
+
+from celery.result import ResultSet
+
+POLL_INTERVAL_SECONDS = 0.25
+
+
+class GroupCollector:
+    """
+    Iterating over the collector yields (chunk_index, result) pairs in completion order until
+    every chunk is done or the deadline passes. Afterwards late holds the chunks that didn't
+    finish in time and failed the ones that raised.
+
+    With revoke_late the chunks that missed the deadline are revoked, so results nobody waits
+    for anymore don't keep the workers busy.
+    """
+
+    def __init__(self, group_result: ResultSet, deadline_seconds: float, revoke_late: bool = False):
+        self.group_result = group_result
+        self.deadline_seconds = deadline_seconds
+        self.revoke_late = revoke_late
+
+        self.completed: Dict[int, Any] = {}
+        self.failed: Dict[int, BaseException] = {}
+        self.late: List[int] = []
+        self.elapsed_seconds = 0.0
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        started = monotonic()
+        pending = dict(enumerate(self.group_result.results))
+
+        while pending:
+            for index, async_result in list(pending.items()):
+                if not async_result.ready():
+                    continue
+
+                del pending[index]
+                if async_result.successful():
+                    self.completed[index] = async_result.result
+                    yield index, async_result.result
+                else:
+                    self.failed[index] = async_result.result
+
+            if not pending or monotonic() - started >= self.deadline_seconds:
+                break
+
+            sleep(POLL_INTERVAL_SECONDS)
+
+        self.late = sorted(pending)
+        self.elapsed_seconds = monotonic() - started
+
+        if self.revoke_late:
+            for index in self.late:
+                pending[index].revoke()
+
+    def collect(self) -> Dict[int, Any]:
+        for _ in self:
+            pass
+        return self.completed
+
+    def report(self, label: str) -> None:
+        total = len(self.group_result.results)
+        print(
+            f"-> [Collector] {label}: {len(self.completed)}/{total} chunks completed in "
+            f"{self.elapsed_seconds:.1f}s, {len(self.failed)} failed, {len(self.late)} late."
+        )
+        if self.late:
+            print(f"-> [Collector] {label}: late chunks {self.late} missed the {self.deadline_seconds}s deadline.")
+        for index, error in self.failed.items():
+            print(f"-> [Collector] {label}: chunk {index} failed: {error!r}")
@@ -1,3 +1,5 @@
+import uuid
+
 NEWS_CATEGORIES: dict[str, str] = {
     "core_financial": "stocks OR earnings OR investment OR market trend OR merger OR acquisition OR financial report",
     "macro_politics": "politics OR election OR central bank OR Fed OR policy OR legislature OR government spending OR opinion column",
@@ -26,3 +28,15 @@ DEFAULT_ARTICLE_DATA = {
 }
 
 DATA_FETCH_LIMIT_PER_FLOW = 100
+
+ALPACA_WATERMARK_SOURCE = "alpaca_bars"
+
+# Namespaces of the name-based (uuid5) ids, changing them changes the id of every row.
+ARTICLE_ID_NAMESPACE = uuid.UUID("b33b862d-00b4-5fdc-92bd-47a557902d23")
+REDDIT_POST_ID_NAMESPACE = uuid.UUID("8f6f3f87-3720-5013-893d-0249f71bc729")
+STOCK_BAR_ID_NAMESPACE = uuid.UUID("4c81f7ff-3131-5618-b45a-a9052525a232")
+
+# Regular trading session of the US exchanges, in the exchanges' local time.
+MARKET_TIMEZONE = "America/New_York"
+MARKET_OPEN_MINUTE = 9 * 60 + 30
+MARKET_SESSION_MINUTES = 390
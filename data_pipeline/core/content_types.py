@@ -0,0 +1,102 @@
+"""
+Early classification of what a URL serves, so images, videos, PDFs and other binaries linked
+from Reddit are dropped before their body is downloaded or handed to trafilatura.
+"""
+
+from typing import Iterable, Optional
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Content types too vague to decide on, the first bytes of the body are sniffed instead.
+AMBIGUOUS_CONTENT_TYPES = ("", "application/octet-stream", "text/plain", "binary/octet-stream")
+
+MAGIC_NUMBERS = (
+    (b"%PDF", "pdf"),
+    (b"\x89PNG", "image"),
+    (b"GIF8", "image"),
+    (b"\xff\xd8\xff", "image"),
+    (b"PK\x03\x04", "binary"),
+    (b"\x1f\x8b", "binary"),
+    (b"ID3", "audio"),
+    (b"OggS", "audio"),
+    (b"\x1a\x45\xdf\xa3", "video"),
+)
+
+# How much of the body is looked at before deciding whether it is a HTML page.
+SNIFF_BYTES = 1024
+
+HTML_MARKERS = (b"<!doctype html", b"<html", b"<head", b"<body", b"<?xml", b"<!--", b"<meta", b"<title")
+
+
+class SkippedContent(Exception):
+    """
+    Raised while downloading a page that isn't worth extracting, reason classifies it
+    (e.g. 'image', 'pdf', 'too_large').
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def is_skipped_host(host: str, skipped_hosts: Iterable[str]) -> bool:
+    """
+    Whether the host is one of the skipped domains or a subdomain of one, e.g. m.youtube.com
+    for youtube.com.
+    """
+    host = host.lower().rstrip(".")
+    return any(host == domain or host.endswith(f".{domain}") for domain in skipped_hosts)
+
+
+def classify_content_type(header: Optional[str]) -> str:
+    """
+    Maps a Content-Type header to 'html', a skip reason, or 'unknown' when only the body
+    can tell.
+    """
+    media_type = (header or "").split(";")[0].strip().lower()
+
+    if media_type in HTML_CONTENT_TYPES:
+        return "html"
+    if media_type in AMBIGUOUS_CONTENT_TYPES:
+        return "unknown"
+    if media_type == "application/pdf":
+        return "pdf"
+
+    for prefix in ("image", "video", "audio"):
+        if media_type.startswith(f"{prefix}/"):
+            return prefix
+
+    return "not_html"
+
+
+def sniff_content(head: bytes) -> str:
+    """
+    Looks at the first bytes of a body, returns 'html', a skip reason, or 'unknown'.
+    """
+    head = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    if head[4:12] in (b"ftypisom", b"ftypmp42", b"ftypMSNV") or head[8:12] == b"WEBP":
+        return "video" if head[4:8] == b"ftyp" else "image"
+
+    lowered = head[:SNIFF_BYTES].lower()
+    if any(marker in lowered for marker in HTML_MARKERS):
+        return "html"
+
+    return "unknown"
+
+
+def body_skip_reason(declared: str, head: bytes) -> Optional[str]:
+    """
+    Returns why a body should be skipped, or None when it's worth parsing. A recognised file
+    signature wins over the declared type, a body that doesn't look like HTML is only skipped
+    when the header didn't claim it was.
+    """
+    sniffed = sniff_content(head)
+    if sniffed == "html":
+        return None
+    if sniffed != "unknown":
+        return sniffed
+    return "not_html" if declared == "unknown" else None
@@ -0,0 +1,82 @@
+"""
+Data-quality profile of a transformed frame: row count, null rate per column, duplicate rows
+and the range of the numeric and time columns.
+
+Frames above the sample threshold are profiled on a fixed-size random sample, so the cost of
+the profile stays flat however much data a run brings. The profile is attached to the Prefect
+run as a table artifact instead of being printed.
+"""
+
+from pandas import DataFrame
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from prefect.artifacts import create_table_artifact
+from typing import Any, Dict, List
+
+from core.config_loader import settings
+
+import pandas as pd
+
+
+def profile_frame(data: DataFrame, sample_threshold: int, sample_size: int) -> Dict[str, Any]:
+    rows = len(data)
+    sampled = rows > sample_threshold
+    sample = data.sample(n=sample_size, random_state=0) if sampled else data
+
+    columns: List[Dict[str, Any]] = []
+    for name in sample.columns:
+        column = sample[name]
+        nulls = int(column.isna().sum())
+        entry: Dict[str, Any] = {
+            "column": str(name),
+            "dtype": str(column.dtype),
+            "null_rate": round(nulls / len(sample), 4) if len(sample) else 0.0,
+            "min": None,
+            "max": None,
+        }
+
+        if nulls < len(sample) and not is_bool_dtype(column.dtype) and (
+            is_numeric_dtype(column.dtype) or is_datetime64_any_dtype(column.dtype)
+        ):
+            entry["min"] = str(column.min())
+            entry["max"] = str(column.max())
+
+        columns.append(entry)
+
+    # Rows are compared through a 64-bit hash each, cheaper than DataFrame.duplicated() on
+    # frames that carry full article bodies.
+    row_hashes = pd.util.hash_pandas_object(sample, index=False)
+    duplicates = int(len(row_hashes) - row_hashes.nunique())
+
+    return {
+        "rows": rows,
+        "profiled_rows": len(sample),
+        "sampled": sampled,
+        "duplicate_rows": duplicates,
+        "columns": columns,
+    }
+
+
+def profile_data(data: DataFrame, label: str) -> Dict[str, Any]:
+    """
+    Profiles the frame and publishes the profile as the '<label>-data-profile' table artifact
+    of the current run.
+    """
+    profile = profile_frame(data, settings.profile_sample_threshold, settings.profile_sample_size)
+
+    summary = (
+        f"{profile['rows']} rows ({'sampled ' + str(profile['profiled_rows']) if profile['sampled'] else 'all profiled'}), "
+        f"{profile['duplicate_rows']} duplicate rows, {len(profile['columns'])} columns"
+    )
+    print(f"-> [Profile] {label}: {summary}")
+
+    try:
+        create_table_artifact(
+            key=f"{label.lower().replace('_', '-')}-data-profile",
+            table=profile["columns"],
+            description=f"Data profile of the {label} data: {summary}",
+        )
+    except Exception as e:
+        # The profile is informative, it must never fail a transformation.
+        print(f"-> [Profile] Could not publish the {label} profile artifact: {e}")
+
+    return profile
@@ -1,20 +1,141 @@
+"""
+Database engine and sessions of the current process.
+
+The engine isn't created at import time. A Celery prefork child would otherwise inherit the
+pooled connections its parent opened, and two processes talking over one socket corrupt each
+other's results. It is created on first use instead, and a forked worker process drops the
+inherited pool before running any task (see celery_app). Every process holds at most
+db_pool_size + db_max_overflow connections, so a worker host uses at most its concurrency
+times that many.
+"""
+
 from contextlib import contextmanager
-from typing import Iterator
-from sqlalchemy import create_engine
+from time import perf_counter
+from typing import Dict, Iterator, Optional
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
 from .config_loader import settings
 
+import os
+import threading
+
+
+class PoolStats:
+    """
+    Checkout counters of the connection pool: how many checkouts, how long they waited for a
+    connection (opening a new one included), how many timed out and the most connections
+    ever checked out at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait_seconds: float, checked_out: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.checkouts, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+    def report(self) -> None:
+        print(f"-> [DB Pool] pid {os.getpid()}: {self.metrics()}")
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+
+        pool_stats.record_checkout(perf_counter() - started, self.checkedout())
+        return connection
+
+
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Returns the engine of the current process, creating it on first use. A process forked
+    without going through dispose_inherited_engine() still gets a pool of its own.
+    """
+    global _engine, _engine_pid
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                settings.database_url,
+                poolclass=InstrumentedQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout_seconds,
+                pool_recycle=settings.db_pool_recycle_seconds,
+                pool_pre_ping=settings.db_pool_pre_ping,
+            )
+            _engine_pid = os.getpid()
+        elif _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            pool_stats.reset()
+            _engine_pid = os.getpid()
+
+        return _engine
+
+
+def dispose_inherited_engine() -> None:
+    """
+    Drops the pool a forked process inherited from its parent. close=False leaves the
+    parent's connections open, the parent keeps using them.
+    """
+    global _engine_pid
+
+    with _engine_lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            pool_stats.reset()
+            _engine_pid = os.getpid()
 
-engine = create_engine(settings.database_url)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
 @contextmanager
 def get_db() -> Iterator[Session]:
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
@@ -0,0 +1,222 @@
+"""
+Local on-disk cache of extracted articles, keyed by the normalized URL.
+
+The same articles show up in several NewsAPI categories, across runs and behind many Reddit
+link posts, so the worker keeps what it already downloaded and parsed in a SQLite file. Entries
+are fresh for a TTL and the least recently used ones are evicted once the file outgrows its size
+budget. The file is shared by all the worker processes of a host, SQLite's WAL mode lets them
+read concurrently. Within a process the async downloads call it from worker threads (see
+download_and_parse), so the connection is shared across threads behind a lock.
+
+An expired entry isn't dropped right away, it keeps the page's ETag/Last-Modified validators so
+the next fetch can be a conditional request, and a 304 answer makes it fresh again without
+downloading or parsing the page.
+"""
+
+from time import time
+from typing import Any, Callable, Dict, Optional
+
+from core.config_loader import settings
+from core.urls import normalize_url
+
+import json
+import os
+import sqlite3
+import threading
+
+# How many writes happen between two checks of the cache size.
+EVICTION_CHECK_INTERVAL = 50
+
+
+class ExtractionCache:
+    def __init__(self, path: str, ttl_seconds: int, stale_ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.revalidated = 0
+        self.evicted = 0
+        self._writes = 0
+        self._lock = threading.RLock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_extractions_last_access ON extractions (last_access)"
+        )
+
+        # Cache files written before the validators were stored lack their columns.
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(extractions)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE extractions ADD COLUMN {column} TEXT")
+
+    def lookup(
+        self, url: str, accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry as {"value", "fresh", "etag", "last_modified"}, or None when the
+        URL was never cached, or when accept rejects its value (e.g. an extraction of a lower
+        tier than the one asked for). A stale entry is only useful for a conditional request.
+        """
+        key = normalize_url(url)
+        now = time()
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at, etag, last_modified FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at, etag, last_modified = row
+            value = json.loads(value)
+            if accept is not None and not accept(value):
+                self.misses += 1
+                return None
+
+            fresh = now - created_at <= self.ttl_seconds
+
+            if fresh:
+                self.hits += 1
+            else:
+                self.expired += 1
+                self.misses += 1
+
+            self._connection.execute(
+                "UPDATE extractions SET last_access = ? WHERE key = ?", (now, key)
+            )
+        return {
+            "value": value,
+            "fresh": fresh,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def put(
+        self,
+        url: str,
+        entry: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        key = normalize_url(url)
+        value = json.dumps(entry, default=str)
+        now = time()
+
+        with self._lock:
+            self._connection.execute(
+                """
+                INSERT OR REPLACE INTO extractions (key, value, size, created_at, last_access, etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, value, len(value), now, now, etag, last_modified),
+            )
+
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self.evict()
+
+    def refresh(self, url: str) -> None:
+        """
+        Marks a stale entry fresh again after the server answered 304 Not Modified.
+        """
+        now = time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE extractions SET created_at = ?, last_access = ? WHERE key = ?",
+                (now, now, normalize_url(url)),
+            )
+            self.revalidated += 1
+
+    def evict(self) -> None:
+        """
+        Drops the entries that are too old to be worth revalidating, then the least recently
+        used ones until the cache is back under 90% of its size budget, so it doesn't evict
+        again on the very next write.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM extractions WHERE created_at < ?",
+                (time() - self.ttl_seconds - self.stale_ttl_seconds,),
+            )
+            self.evicted += cursor.rowcount
+
+            (total_size,) = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+            if total_size <= self.max_bytes:
+                return
+
+            to_free = total_size - int(self.max_bytes * 0.9)
+            freed = 0
+            stale_keys = []
+            for key, size in self._connection.execute(
+                "SELECT key, size FROM extractions ORDER BY last_access"
+            ):
+                stale_keys.append((key,))
+                freed += size
+                if freed >= to_free:
+                    break
+
+            self._connection.executemany("DELETE FROM extractions WHERE key = ?", stale_keys)
+            self.evicted += len(stale_keys)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "revalidated": self.revalidated,
+            "evicted": self.evicted,
+        }
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_pid: Optional[int] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    Returns the cache of the current process, or None when it is disabled. SQLite connections
+    must not cross a fork(), so every prefork child opens its own.
+    """
+    global _cache, _cache_pid
+
+    if not settings.extraction_cache_enabled:
+        return None
+
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = ExtractionCache(
+            settings.extraction_cache_path,
+            settings.extraction_cache_ttl_seconds,
+            settings.extraction_cache_stale_ttl_seconds,
+            settings.extraction_cache_max_bytes,
+        )
+        _cache_pid = os.getpid()
+
+    return _cache
@@ -0,0 +1,91 @@
+from time import perf_counter
+from typing import Dict
+
+
+class ExtractionStats:
+    """
+    Per-batch counters of the article fetching tasks, used to tell whether a batch is limited
+    by the network (download) or by the CPU (parse).
+
+    Download and parse times are summed over every URL, so with concurrent requests
+    they add up to more than the batch's wall time.
+    """
+
+    def __init__(self):
+        self.started_at = perf_counter()
+
+        self.downloads = 0
+        self.download_seconds = 0.0
+
+        self.parsed = 0
+        self.parse_seconds = 0.0
+        self.parse_wait_seconds = 0.0
+        self.tiers: Dict[str, int] = {}
+
+        self.failed = 0
+        self.skipped: Dict[str, int] = {}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.saved_bytes = 0
+        self.saved_parse_seconds = 0.0
+
+        self.revalidations = 0
+        self.not_modified = 0
+        self.revalidation_saved_bytes = 0
+        self.revalidation_saved_parse_seconds = 0.0
+
+    def record_download(self, seconds: float) -> None:
+        self.downloads += 1
+        self.download_seconds += seconds
+
+    def record_parse(self, parse_seconds: float, total_seconds: float, tier: str = "full") -> None:
+        """
+        parse_seconds is the time spent parsing inside the pool, total_seconds also includes
+        the time the page waited in the pool's queue. tier tells which extractor produced the
+        text ('fast', 'full' or 'escalated' from fast to full).
+        """
+        self.parsed += 1
+        self.tiers[tier] = self.tiers.get(tier, 0) + 1
+        self.parse_seconds += parse_seconds
+        self.parse_wait_seconds += max(total_seconds - parse_seconds, 0.0)
+
+    def record_failure(self) -> None:
+        self.failed += 1
+
+    def record_skip(self, reason: str) -> None:
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def record_cache_hit(self, saved_bytes: int, saved_parse_seconds: float) -> None:
+        self.cache_hits += 1
+        self.saved_bytes += saved_bytes
+        self.saved_parse_seconds += saved_parse_seconds
+
+    def record_cache_miss(self) -> None:
+        self.cache_misses += 1
+
+    def record_revalidation(self, not_modified: bool, saved_bytes: int = 0, saved_parse_seconds: float = 0.0) -> None:
+        self.revalidations += 1
+        if not_modified:
+            self.not_modified += 1
+            self.revalidation_saved_bytes += saved_bytes
+            self.revalidation_saved_parse_seconds += saved_parse_seconds
+
+    def summary(self) -> str:
+        wall_seconds = perf_counter() - self.started_at
+        avg_download = self.download_seconds / self.downloads if self.downloads else 0.0
+        avg_parse = self.parse_seconds / self.parsed if self.parsed else 0.0
+        avg_wait = self.parse_wait_seconds / self.parsed if self.parsed else 0.0
+
+        return (
+            f"wall {wall_seconds:.2f}s | "
+            f"download {self.downloads} urls, {self.download_seconds:.2f}s total, {avg_download:.3f}s avg | "
+            f"parse {self.parsed} pages, {self.parse_seconds:.2f}s total, {avg_parse:.3f}s avg, "
+            f"{avg_wait:.3f}s avg queue wait, tiers {self.tiers or 0} | "
+            f"cache {self.cache_hits} hits / {self.cache_misses} misses, "
+            f"saved {self.saved_bytes / 1024:.0f} KiB and {self.saved_parse_seconds:.2f}s of parsing | "
+            f"revalidated {self.revalidations} ({self.not_modified} not modified), "
+            f"saved {self.revalidation_saved_bytes / 1024:.0f} KiB and {self.revalidation_saved_parse_seconds:.2f}s of parsing | "
+            f"skipped {self.skipped or 0} | "
+            f"failed {self.failed}"
+        )
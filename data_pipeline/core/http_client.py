@@ -0,0 +1,118 @@
+"""
+Worker-wide HTTP client for the article fetching Celery tasks.
+
+Running every task through asyncio.run() creates and closes an event loop per task, so an
+httpx.AsyncClient (and its connection pool) could never outlive a single batch. Instead each
+worker process keeps one long-lived event loop, and the pooled client and the concurrency
+limits are bound to that loop, so keep-alive connections are reused across tasks.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Coroutine, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from core.config_loader import settings
+
+import asyncio
+import httpx
+import os
+
+T = TypeVar("T")
+
+
+class HostLimiter:
+    """
+    Caps the number of in-flight requests globally and per host, so a batch full of links to
+    the same publisher doesn't open dozens of connections against it at once.
+    """
+
+    def __init__(self, max_concurrency: int, max_per_host: int):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def acquire(self, url: str) -> AsyncIterator[None]:
+        host = (urlsplit(url).hostname or "").lower()
+
+        host_semaphore = self._hosts.get(host)
+        if host_semaphore is None:
+            host_semaphore = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+
+        # The host slot is taken first, so requests queued behind a busy publisher
+        # don't hold on to one of the global slots while they wait.
+        async with host_semaphore:
+            async with self._global:
+                yield
+
+
+_owner_pid: Optional[int] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[httpx.AsyncClient] = None
+_limiter: Optional[HostLimiter] = None
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _owner_pid, _loop, _client, _limiter
+
+    # State inherited through fork() belongs to the parent process, start from scratch.
+    if _owner_pid != os.getpid() or _loop is None or _loop.is_closed():
+        _owner_pid = os.getpid()
+        _loop = asyncio.new_event_loop()
+        _client = None
+        _limiter = None
+
+    return _loop
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs the coroutine to completion on the process-wide event loop.
+    """
+    loop = _get_worker_loop()
+    future = loop.create_task(coro)
+
+    try:
+        return loop.run_until_complete(future)
+    except BaseException:
+        # A soft time limit (or any other interruption) leaves the batch half done,
+        # cancel it so the leftovers don't keep running inside the next task.
+        future.cancel()
+        try:
+            loop.run_until_complete(future)
+        except BaseException:
+            pass
+        raise
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the pooled client of the current worker process, it must be used from inside
+    run_in_worker_loop().
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+            ),
+            timeout=settings.http_timeout_seconds,
+            follow_redirects=True,
+        )
+
+    return _client
+
+
+def get_host_limiter() -> HostLimiter:
+    global _limiter
+
+    if _limiter is None:
+        _limiter = HostLimiter(
+            settings.http_max_connections,
+            settings.http_max_connections_per_host,
+        )
+
+    return _limiter
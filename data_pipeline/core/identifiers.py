@@ -0,0 +1,66 @@
+"""
+Deterministic ids derived from what identifies a row, so a rerun or a retried task produces
+the same id for the same article, post or bar instead of a fresh uuid4.
+
+- articles: the canonical URL (see core.urls.normalize_url)
+- reddit posts: the reddit_id
+- stock bars: the ticker and the bar's timestamp
+"""
+
+from pandas import Series
+from typing import Any, Callable
+
+from core.constants import ARTICLE_ID_NAMESPACE, REDDIT_POST_ID_NAMESPACE, STOCK_BAR_ID_NAMESPACE
+from core.urls import normalize_url
+
+import numpy as np
+import pandas as pd
+import uuid
+
+STOCK_BAR_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def article_id(url: str) -> uuid.UUID:
+    return uuid.uuid5(ARTICLE_ID_NAMESPACE, normalize_url(url))
+
+
+def reddit_post_id(reddit_id: str) -> uuid.UUID:
+    return uuid.uuid5(REDDIT_POST_ID_NAMESPACE, reddit_id)
+
+
+def stock_bar_id(ticker: str, timestamp: Any) -> uuid.UUID:
+    """
+    The timestamp must be timezone aware, the key uses its UTC time to the second.
+    """
+    utc = pd.Timestamp(timestamp).tz_convert("UTC")
+    return uuid.uuid5(STOCK_BAR_ID_NAMESPACE, f"{ticker}|{utc.strftime(STOCK_BAR_TIME_FORMAT)}")
+
+
+def id_column(column: Series, make_id: Callable[[str], uuid.UUID]) -> Series:
+    """
+    Maps every distinct value of the column to its id once. Missing values get no id.
+    """
+    codes, uniques = pd.factorize(column)
+    ids = np.array([str(make_id(value)) for value in uniques] + [None], dtype=object)
+
+    return Series(ids[codes], index=column.index)
+
+
+def article_id_column(urls: Series) -> Series:
+    return id_column(urls, article_id)
+
+
+def reddit_post_id_column(reddit_ids: Series) -> Series:
+    return id_column(reddit_ids, lambda reddit_id: reddit_post_id(str(reddit_id)))
+
+
+def stock_bar_id_column(tickers: Series, timestamps: Series) -> Series:
+    """
+    Same ids as stock_bar_id(), with the keys formatted for the whole column at once.
+    """
+    keys = (
+        tickers.astype(str)
+        + "|"
+        + timestamps.dt.tz_convert("UTC").dt.strftime(STOCK_BAR_TIME_FORMAT)
+    )
+    return id_column(keys, lambda key: uuid.uuid5(STOCK_BAR_ID_NAMESPACE, key))
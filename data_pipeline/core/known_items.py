@@ -0,0 +1,114 @@
+"""
+In-process index of the URLs and Reddit IDs that are already stored in the database, used to
+drop known items before any Celery or HTTP work is dispatched for them.
+
+A Bloom filter seeded from the database answers "definitely new" for most fresh items without
+a query, only the items it reports as "maybe known" are confirmed with one batched lookup.
+"""
+
+from time import monotonic
+from typing import Callable, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+
+import hashlib
+import math
+
+LOOKUP_BATCH_SIZE = 1000
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+
+        self.size = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing, two 64 bit halves of one digest stand in for k hash functions.
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class KnownItemIndex:
+    """
+    load_all streams every key stored in the database and seeds the filter, load_existing
+    returns which of the given keys really exist. The filter is rebuilt every refresh_seconds
+    so it picks up what other runs have loaded in the meantime.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load_all: Callable[[Session], Iterable[str]],
+        load_existing: Callable[[Session, List[str]], Sequence[str]],
+        capacity: int,
+        refresh_seconds: int,
+    ):
+        self.name = name
+        self.load_all = load_all
+        self.load_existing = load_existing
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+
+        self._filter: Optional[BloomFilter] = None
+        self._loaded_at = 0.0
+        self._count = 0
+
+    def _ensure_filter(self, session: Session) -> BloomFilter:
+        if self._filter is not None and monotonic() - self._loaded_at < self.refresh_seconds:
+            return self._filter
+
+        keys = list(self.load_all(session))
+        bloom = BloomFilter(max(self.capacity, 2 * len(keys)))
+        for key in keys:
+            bloom.add(key)
+
+        self._filter = bloom
+        self._count = len(keys)
+        self._loaded_at = monotonic()
+        print(f"-> [Dedup] Seeded the {self.name} filter with {self._count} known keys.")
+
+        return bloom
+
+    def find_known(self, keys: Iterable[str]) -> Set[str]:
+        """
+        Returns the subset of keys that already exist in the database.
+        """
+        candidates = {key for key in keys if key}
+        if not candidates:
+            return set()
+
+        with get_db() as session:
+            bloom = self._ensure_filter(session)
+
+            maybe_known = [key for key in candidates if key in bloom]
+            known: Set[str] = set()
+            for start in range(0, len(maybe_known), LOOKUP_BATCH_SIZE):
+                known.update(
+                    self.load_existing(session, maybe_known[start:start + LOOKUP_BATCH_SIZE])
+                )
+
+        print(
+            f"-> [Dedup] {self.name}: {len(candidates)} candidates, "
+            f"{len(candidates) - len(maybe_known)} ruled out by the filter, "
+            f"{len(maybe_known)} checked against the database, {len(known)} already known."
+        )
+        return known
@@ -0,0 +1,165 @@
+"""
+Splits a batch of work into Celery chunks sized from the live worker concurrency instead of a
+fixed number of chunks.
+
+Items can carry a cost and a group key (e.g. the URL's host). The items of the same group are
+spread across the chunks so one slow publisher doesn't end up holding back a single chunk, and
+with it the whole group, and the chunks are balanced on cost. A URL costs the time its host
+took on the workers in earlier batches (see HostLatencies), a page isn't sized before it is
+fetched.
+"""
+
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+from urllib.parse import urlsplit
+
+from celery_app import app
+from core.config_loader import settings
+
+import math
+
+T = TypeVar("T")
+
+# Key under which the fetch tasks return how long each URL took, popped by the dispatcher.
+FETCH_SECONDS_KEY = "_fetch_seconds"
+
+_concurrency: Optional[int] = None
+_concurrency_checked_at = 0.0
+
+
+def get_worker_concurrency() -> int:
+    """
+    Total number of task slots across the live Celery workers, cached for a few minutes
+    since asking the workers is a broadcast round-trip.
+    """
+    global _concurrency, _concurrency_checked_at
+
+    if _concurrency is not None and monotonic() - _concurrency_checked_at < settings.worker_concurrency_cache_seconds:
+        return _concurrency
+
+    concurrency = 0
+    try:
+        stats = app.control.inspect(timeout=1.0).stats() or {}
+        concurrency = sum(
+            worker_stats.get("pool", {}).get("max-concurrency", 0)
+            for worker_stats in stats.values()
+        )
+    except Exception as e:
+        print(f"-> [Partitioner] Could not inspect the Celery workers: {e}")
+
+    if concurrency <= 0:
+        concurrency = settings.default_worker_concurrency
+
+    _concurrency = concurrency
+    _concurrency_checked_at = monotonic()
+    return concurrency
+
+
+def url_host(url: Optional[str]) -> str:
+    return (urlsplit(url).hostname or "").lower() if url else ""
+
+
+class HostLatencies:
+    """
+    Moving average of how long a URL of each host takes on the workers (download, parse and
+    cache lookup included), learned from the results of the earlier batches of this process.
+    A host that was never seen costs the average of the known ones.
+    """
+
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self._seconds: Dict[str, float] = {}
+
+    def record(self, url: Optional[str], seconds: float) -> None:
+        host = url_host(url)
+        previous = self._seconds.get(host)
+        self._seconds[host] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+
+    def record_result(self, url: Optional[str], result: Dict[str, Any]) -> None:
+        """
+        Pops the timing a fetch task attached to one of its results and records it.
+        """
+        seconds = result.pop(FETCH_SECONDS_KEY, None)
+        if url and seconds is not None:
+            self.record(url, seconds)
+
+    def cost(self, url: Optional[str]) -> float:
+        seconds = self._seconds.get(url_host(url))
+        if seconds is not None:
+            return max(seconds, 0.01)
+        if self._seconds:
+            return sum(self._seconds.values()) / len(self._seconds)
+        return 1.0
+
+
+host_latencies = HostLatencies()
+
+
+def chunk_count(item_count: int, concurrency: int, min_chunk_size: int) -> int:
+    """
+    Enough chunks to keep every worker slot busy (times the oversubscription factor, so a
+    slow chunk can be absorbed by the slots that finish early), but never so many that a
+    chunk holds less than min_chunk_size items and the task overhead dominates.
+    """
+    if item_count == 0:
+        return 0
+
+    by_size = math.ceil(item_count / min_chunk_size) if min_chunk_size > 0 else item_count
+    by_workers = concurrency * settings.partition_oversubscription
+
+    return max(1, min(item_count, by_workers, by_size))
+
+
+def partition(
+    items: Sequence[T],
+    concurrency: int,
+    min_chunk_size: int,
+    cost: Optional[Callable[[T], float]] = None,
+    group_key: Optional[Callable[[T], str]] = None,
+) -> List[List[int]]:
+    """
+    Returns the chunks as lists of indices into items, so the caller can map results back to
+    the original positions. The number of chunks depends on the number of items, the cost
+    only decides which chunk each item goes to.
+
+    Without a cost or a group key the items are split into contiguous, equally sized ranges.
+    """
+    count = chunk_count(len(items), concurrency, min_chunk_size)
+
+    if count == 0:
+        return []
+
+    if cost is None and group_key is None:
+        size, remainder = divmod(len(items), count)
+        chunks, start = [], 0
+        for i in range(count):
+            end = start + size + (1 if i < remainder else 0)
+            chunks.append(list(range(start, end)))
+            start = end
+        return chunks
+
+    costs = [cost(item) for item in items] if cost else [1.0] * len(items)
+
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(group_key(item) if group_key else "", []).append(index)
+
+    chunks = [[] for _ in range(count)]
+    loads = [0.0] * count
+
+    # Most expensive groups first, each item goes to the least loaded chunk that doesn't hold
+    # more than its share of the group yet. The share has one item of slack, so the chunks
+    # that got the slow hosts take fewer of the fast ones.
+    for indices in sorted(groups.values(), key=lambda g: sum(costs[i] for i in g), reverse=True):
+        per_chunk = [0] * count
+        share = math.ceil(len(indices) / count) + (1 if len(indices) > count else 0)
+        for index in sorted(indices, key=lambda i: costs[i], reverse=True):
+            target = min(
+                (c for c in range(count) if per_chunk[c] < share),
+                key=lambda c: (loads[c], per_chunk[c]),
+            )
+            chunks[target].append(index)
+            per_chunk[target] += 1
+            loads[target] += costs[index]
+
+    return [sorted(chunk) for chunk in chunks if chunk]
@@ -0,0 +1,135 @@
+"""
+Token buckets that keep the NewsAPI, Alpaca and Reddit calls of every flow and worker under the
+providers' quotas, instead of tripping them and sleeping through the retry countdown.
+
+There is one bucket per provider and credential. With the 'postgres' backend the bucket lives in
+the rate_limit_buckets table, so all the processes of the cluster draw from the same one. Each
+acquire reserves its slot with a single atomic statement and then sleeps until the slot comes up,
+which spreads the requests evenly just below the configured rate.
+"""
+
+from time import sleep
+from typing import Dict, Optional
+
+from core.config_loader import settings
+from core.database import get_db
+from services import RateLimitService
+
+import asyncio
+import hashlib
+import threading
+import time
+
+PROVIDER_LIMITS = {
+    "newsapi": ("rate_limit_newsapi_per_second", "rate_limit_newsapi_burst", "news_api_key"),
+    "alpaca": ("rate_limit_alpaca_per_second", "rate_limit_alpaca_burst", "alpaca_api_key"),
+    "reddit": ("rate_limit_reddit_per_second", "rate_limit_reddit_burst", "reddit_client_id"),
+}
+
+
+class RateLimiter:
+    def __init__(self, key: str, rate: float, capacity: float, backend: str):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.backend = backend
+
+        self.acquisitions = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._local_tokens = capacity
+        self._local_updated_at = time.monotonic()
+        # Until then the shared bucket is skipped, it just failed
+        self._shared_retry_at = 0.0
+
+    def _reserve_local(self, cost: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._local_tokens = min(
+                self.capacity, self._local_tokens + (now - self._local_updated_at) * self.rate
+            ) - cost
+            self._local_updated_at = now
+            return self._local_tokens
+
+    def _reserve(self, cost: float) -> float:
+        """
+        Returns how many seconds the caller has to wait before its request may go out.
+        """
+        if self.backend == "postgres" and time.monotonic() >= self._shared_retry_at:
+            try:
+                with get_db() as session:
+                    tokens = RateLimitService.reserve(session, self.key, self.rate, self.capacity, cost)
+                    session.commit()
+            except Exception as e:
+                # Better to limit per process than to stop extracting when the database is busy,
+                # the shared bucket is tried again once the fallback period is over.
+                print(
+                    f"-> [RateLimiter] Shared bucket {self.key} unavailable, limiting locally "
+                    f"for {settings.rate_limit_fallback_seconds:.0f}s: {e}"
+                )
+                self._shared_retry_at = time.monotonic() + settings.rate_limit_fallback_seconds
+                tokens = self._reserve_local(cost)
+        else:
+            tokens = self._reserve_local(cost)
+
+        return max(0.0, -tokens / self.rate)
+
+    def _record(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.acquisitions += 1
+            if wait_seconds > 0:
+                self.waits += 1
+                self.total_wait_seconds += wait_seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def acquire(self, cost: float = 1.0) -> float:
+        wait_seconds = self._reserve(cost)
+        self._record(wait_seconds)
+        if wait_seconds > 0:
+            sleep(wait_seconds)
+        return wait_seconds
+
+    async def acquire_async(self, cost: float = 1.0) -> float:
+        wait_seconds = await asyncio.to_thread(self._reserve, cost)
+        self._record(wait_seconds)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+        return wait_seconds
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "acquisitions": self.acquisitions,
+            "waits": self.waits,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+        }
+
+    def report(self) -> None:
+        print(f"-> [RateLimiter] {self.key.split(':')[0]}: {self.metrics()}")
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, credential: Optional[str] = None) -> RateLimiter:
+    """
+    Returns the limiter of the provider for the given credential (by default the one in the
+    settings). Only a hash of the credential ends up in the bucket key.
+    """
+    rate_setting, burst_setting, credential_setting = PROVIDER_LIMITS[provider]
+    credential = credential or getattr(settings, credential_setting)
+    key = f"{provider}:{hashlib.sha256(credential.encode('utf-8')).hexdigest()[:16]}"
+
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(
+                key,
+                getattr(settings, rate_setting) * settings.rate_limit_headroom,
+                getattr(settings, burst_setting),
+                settings.rate_limit_backend,
+            )
+        return _limiters[key]
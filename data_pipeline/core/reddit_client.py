@@ -0,0 +1,141 @@
+"""
+Minimal async client for the Reddit listing endpoints, used by the async Reddit extraction mode.
+
+PRAW is synchronous and fetches listing pages lazily, one blocking round-trip at a time. This
+client talks to the same OAuth API through httpx, so several subreddits and their pages can be
+fetched concurrently. The API and auth base URLs come from the settings, so it can be pointed at
+a local fake Reddit server.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from core.config_loader import settings
+from core.rate_limiter import get_rate_limiter
+
+import asyncio
+import httpx
+
+LISTING_PAGE_SIZE = 100
+
+# A request is retried this many times at most after a 429, and never waits longer than this
+# in total, before the extraction of the subreddit gives up.
+MAX_RATE_LIMITED_RETRIES = 5
+MAX_RATE_LIMITED_WAIT_SECONDS = 120.0
+
+
+class RedditAPIError(Exception):
+    pass
+
+
+class AsyncRedditClient:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self._token: Optional[str] = None
+        self._auth_lock = asyncio.Lock()
+
+    async def authenticate(self, stale_token: Optional[str] = None) -> str:
+        """
+        Fetches a new access token, unless another coroutine already replaced stale_token while
+        this one waited for the lock. The concurrent first requests of every subreddit share
+        a single token request this way.
+        """
+        async with self._auth_lock:
+            if self._token is not None and self._token != stale_token:
+                return self._token
+
+            response = await self.client.post(
+                f"{settings.reddit_auth_url}/api/v1/access_token",
+                auth=(settings.reddit_client_id, settings.reddit_client_secret),
+                data={
+                    "grant_type": "password",
+                    "username": settings.reddit_username,
+                    "password": settings.reddit_password,
+                },
+                headers={"User-Agent": settings.reddit_user_agent},
+            )
+            response.raise_for_status()
+
+            token = response.json().get("access_token")
+            if not token:
+                raise RedditAPIError(f"Reddit didn't return an access token: {response.text[:200]}")
+
+            self._token = token
+            return token
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        token = self._token or await self.authenticate()
+
+        reauthenticated = False
+        rate_limited = 0
+        waited = 0.0
+        while True:
+            await get_rate_limiter("reddit").acquire_async()
+            response = await self.client.get(
+                f"{settings.reddit_api_base_url}{path}",
+                params={**params, "raw_json": 1},
+                headers={
+                    "Authorization": f"bearer {token}",
+                    "User-Agent": settings.reddit_user_agent,
+                },
+            )
+
+            if response.status_code == 401:
+                # An expired token is replaced once, a second 401 means the credentials or the
+                # API URL are wrong and retrying won't help.
+                if reauthenticated:
+                    raise RedditAPIError(f"Reddit rejected a fresh access token for {path}")
+                token = await self.authenticate(stale_token=token)
+                reauthenticated = True
+                continue
+
+            if response.status_code == 429:
+                # Reddit tells how many seconds are left in the current rate limit window
+                retry_after = float(
+                    response.headers.get("retry-after")
+                    or response.headers.get("x-ratelimit-reset")
+                    or 1
+                )
+                rate_limited += 1
+                if rate_limited > MAX_RATE_LIMITED_RETRIES or waited + retry_after > MAX_RATE_LIMITED_WAIT_SECONDS:
+                    raise RedditAPIError(
+                        f"Reddit kept rate limiting {path} after {rate_limited - 1} retries ({waited:.0f}s waited)"
+                    )
+                waited += retry_after
+                await asyncio.sleep(retry_after)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    async def iter_listing(
+        self, subreddit: str, query: Optional[str], limit: int
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields the posts of a subreddit one listing page at a time, newest first. With a query
+        the subreddit is searched, otherwise its 'new' listing is read.
+        """
+        if query:
+            path = f"/r/{subreddit}/search"
+            params: Dict[str, Any] = {"q": query, "restrict_sr": "on", "sort": "new"}
+        else:
+            path = f"/r/{subreddit}/new"
+            params = {}
+
+        after = None
+        fetched = 0
+        while fetched < limit:
+            page_params = {**params, "limit": min(LISTING_PAGE_SIZE, limit - fetched)}
+            if after:
+                page_params["after"] = after
+
+            listing = (await self._get(path, page_params)).get("data") or {}
+            posts = [child["data"] for child in listing.get("children", []) if child.get("kind") == "t3"]
+            if not posts:
+                return
+
+            fetched += len(posts)
+            yield posts
+
+            after = listing.get("after")
+            if not after:
+                return
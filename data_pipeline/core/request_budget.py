@@ -0,0 +1,20 @@
+import threading
+
+
+class RequestBudget:
+    """
+    Thread-safe count of the API requests a run may still spend, shared by the threads that
+    page through the NewsAPI categories so together they stay inside the plan's quota.
+    """
+
+    def __init__(self, max_requests: int):
+        self.max_requests = max_requests
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.used >= self.max_requests:
+                return False
+            self.used += 1
+            return True
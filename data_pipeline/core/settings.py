@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,6 +10,12 @@ class Settings(BaseSettings):
     alpaca_secret_key: str
 
     database_url: str
+    # Connection pool of every process (each prefork child has its own)
+    db_pool_size: int = 2
+    db_max_overflow: int = 3
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 30 * 60
+    db_pool_pre_ping: bool = True
 
     celery_broker_url: str
     celery_result_backend: str
@@ -18,3 +25,97 @@ class Settings(BaseSettings):
     reddit_username: str
     reddit_password: str
     reddit_user_agent: str
+
+    # Shared HTTP client used by the article fetching workers
+    http_max_connections: int = 64
+    http_max_keepalive_connections: int = 32
+    http_max_connections_per_host: int = 4
+    http_timeout_seconds: float = 15.0
+    http_max_body_bytes: int = 5 * 1024 * 1024
+    # Domains that only serve media, links to them or to any of their subdomains are never downloaded
+    http_skipped_hosts: List[str] = [
+        "i.redd.it",
+        "v.redd.it",
+        "preview.redd.it",
+        "imgur.com",
+        "youtube.com",
+        "youtu.be",
+    ]
+
+    # Process pool used to parse the downloaded articles, 0 parses in a thread instead
+    parse_pool_workers: int = 2
+    # 'fast', 'full' or 'tiered' (fast first, full when the fast text is shorter than the minimum)
+    article_extraction_mode: str = "tiered"
+    article_min_fast_length: int = 500
+
+    # On-disk cache of extracted articles, shared by the worker processes of a host
+    extraction_cache_enabled: bool = True
+    extraction_cache_path: str = "/tmp/stonks/extraction_cache.sqlite3"
+    extraction_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    # How long expired entries are kept around for conditional (ETag/Last-Modified) requests
+    extraction_cache_stale_ttl_seconds: int = 30 * 24 * 60 * 60
+    extraction_cache_max_bytes: int = 512 * 1024 * 1024
+
+    # Pre-dispatch dedup of URLs and Reddit IDs that are already in the database
+    known_items_capacity: int = 1_000_000
+    known_items_refresh_seconds: int = 60 * 60
+
+    # Partitioning of the work sent to the Celery workers
+    default_worker_concurrency: int = 4
+    worker_concurrency_cache_seconds: int = 300
+    partition_oversubscription: int = 2
+    partition_min_urls_per_chunk: int = 5
+    partition_min_rows_per_chunk: int = 5000
+
+    # How long the dispatchers wait for a Celery group before going on with partial results
+    celery_result_deadline_seconds: float = 60.0
+
+    # Incremental Alpaca extraction
+    alpaca_initial_backfill_days: int = 2
+    alpaca_max_backfill_days: int = 30
+    alpaca_data_delay_minutes: int = 16
+    alpaca_window_merge_minutes: int = 60
+
+    # Sharding of the Alpaca bar requests across the Celery workers
+    alpaca_symbols_per_shard: int = 25
+    alpaca_shard_window_hours: int = 24
+
+    # Missing minutes of the regular session are added as filled bars (flagged is_filled)
+    alpaca_fill_minute_gaps: bool = True
+
+    # How the stock bars are written, "copy" (COPY into a staging table, then merged) or
+    # "insert" (multi-row INSERT ... ON CONFLICT DO NOTHING)
+    stock_bar_load_method: str = "copy"
+
+    # Rows per INSERT ... ON CONFLICT / bulk UPDATE statement of the loaders
+    db_insert_batch_size: int = 1000
+
+    # NewsAPI paging, the developer plan stops at 100 results per query
+    news_api_page_size: int = 100
+    news_api_max_results: int = 100
+    news_api_max_requests_per_run: int = 50
+    news_api_max_concurrency: int = 5
+
+    # Reddit extraction, "praw" or "async" (concurrent listing pages through httpx)
+    reddit_extraction_mode: str = "praw"
+    reddit_api_base_url: str = "https://oauth.reddit.com"
+    reddit_auth_url: str = "https://www.reddit.com"
+    # Already stored posts skip the article fetch, but their score, comment count and upvote
+    # ratio are still written to the database
+    reddit_refresh_known_metrics: bool = True
+
+    # Token buckets shared by every flow and worker, "postgres" or "local" (per process only)
+    rate_limit_backend: str = "postgres"
+    rate_limit_headroom: float = 0.9
+    # After the shared bucket fails, how long a limiter counts locally before trying it again
+    rate_limit_fallback_seconds: float = 60.0
+    rate_limit_newsapi_per_second: float = 1.0
+    rate_limit_newsapi_burst: int = 5
+    rate_limit_alpaca_per_second: float = 200 / 60
+    rate_limit_alpaca_burst: int = 10
+    rate_limit_reddit_per_second: float = 100 / 60
+    rate_limit_reddit_burst: int = 10
+
+    # Data-quality profile of the transformed frames, larger frames are profiled on a sample
+    profile_sample_threshold: int = 100_000
+    profile_sample_size: int = 50_000
@@ -1,8 +1,9 @@
 from typing import List
 from prefect import flow
+from core.bar_columns import bar_count
 from tasks.extraction import extract_alpaca_data
 from tasks.transformation import transform_alpaca_data
-from tasks.loading import load_alpaca_data
+from tasks.loading import advance_alpaca_watermarks, load_alpaca_data
 from tasks.load_to_s3 import load_data_to_s3
 from tasks.trigger_databricks_job import trigger_databrick_job
 
@@ -14,10 +15,16 @@ async def alpaca_etl_flow(symbols: List[str]) -> int:
     print(f"*** Running Alpaca ETL for symbol: {symbols} ***")
     
     raw_data = extract_alpaca_data(symbols)
+
+    if not bar_count(raw_data):
+        print("*** No new stock bars since the last run ***")
+        return 0
+
     transformed_data, ticker_list = transform_alpaca_data(raw_data)
     path = load_data_to_s3(transformed_data, "stocks")
 
     if path:
+        advance_alpaca_watermarks(transformed_data)
         await trigger_databrick_job("get_stocks_from_s3", path)
 
-    return len(raw_data)
+    return bar_count(raw_data)
@@ -2,7 +2,7 @@ from prefect import flow
 from prefect_aws.s3 import asyncio
 from core.constants import NEWS_CATEGORIES, SUBREDDITS, STOCK_TICKERS
 from flows.news_etl_flow import news_etl_flow
-from flows.praw_etl_flow import praw_etl_flow
+from flows.praw_etl_flow import reddit_etl_flow
 from flows.alpaca_etl_flow import alpaca_etl_flow
 
 
@@ -17,11 +17,9 @@ async def main_ingestion_flow():
     news_count = 0
     praw_count = 0
 
-    for category_name, query_string in NEWS_CATEGORIES.items():
-        news_count += await news_etl_flow(query_string, category_name)
+    news_count += await news_etl_flow(NEWS_CATEGORIES)
 
-    for subreddit in SUBREDDITS:
-        praw_count += await praw_etl_flow(subreddit["name"], subreddit["flairs"], wait_for=None)
+    praw_count += await reddit_etl_flow(SUBREDDITS)
 
     alpaca_result = await alpaca_etl_flow(symbols=STOCK_TICKERS, wait_for=None)
     alpaca_count = alpaca_result
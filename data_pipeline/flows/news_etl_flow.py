@@ -1,23 +1,33 @@
+from typing import Dict
 from prefect import flow
 
-from tasks.extraction import extract_news_data
+from core.constants import NEWS_CATEGORIES
+from tasks.extraction import extract_all_news_data
 from tasks.transformation import transform_news_data
 from tasks.loading import load_news_data
 from tasks.load_to_s3 import load_data_to_s3
 from tasks.trigger_databricks_job import trigger_databrick_job
 
 @flow(name="NewsAPI ETL Pipeline", log_prints=True)
-async def news_etl_flow(query: str, category: str) -> int:
+async def news_etl_flow(categories: Dict[str, str] = NEWS_CATEGORIES) -> int:
     """
     Dedicated ETL pipeline for NewsAPI.
+
+    All the category queries are extracted together, so the ingestion takes as long as the
+    slowest category instead of the sum of all of them.
     """
-    print(f"*** Running News ETL for query: {query} ***")
+    print(f"*** Running News ETL for categories: {list(categories)} ***")
+
+    raw_data_by_category = extract_all_news_data(categories)
+
+    total_records = 0
+    for category, raw_data in raw_data_by_category.items():
+        transformed_data = transform_news_data(raw_data)
+        path = load_data_to_s3(transformed_data, "news", category)
 
-    raw_data = extract_news_data(query)
-    transformed_data = transform_news_data(raw_data)
-    path = load_data_to_s3(transformed_data, "news", category)
+        if path: 
+            await trigger_databrick_job("get_news_from_s3", path)
 
-    if path: 
-        await trigger_databrick_job("get_news_from_s3", path)
+        total_records += len(raw_data)
     
-    return len(raw_data)
+    return total_records
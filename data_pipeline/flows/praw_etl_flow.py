@@ -1,9 +1,11 @@
-from typing import List
+from typing import Any, Dict, List
 from prefect import flow
 
-from tasks.extraction import extract_praw_data
+from core.config_loader import settings
+from core.constants import SUBREDDITS
+from tasks.extraction import extract_praw_data, extract_reddit_data_async, split_known_posts
 from tasks.transformation import transform_praw_data
-from tasks.loading import load_praw_data
+from tasks.loading import load_praw_data, refresh_reddit_metrics
 from tasks.load_to_s3 import load_data_to_s3
 from tasks.trigger_databricks_job import trigger_databrick_job
 
@@ -14,7 +16,11 @@ async def praw_etl_flow(subreddit_name: str, subreddit_flair: List) -> int:
     """
     print(f"*** Running PRAW ETL for subreddit: {subreddit_name} ***")
 
-    raw_data = extract_praw_data(subreddit=subreddit_name, flairs=subreddit_flair)
+    raw_data, known_posts = split_known_posts(
+        extract_praw_data(subreddit=subreddit_name, flairs=subreddit_flair)
+    )
+    refresh_reddit_metrics(known_posts)
+
     transformed_data = transform_praw_data(raw_data)
     path = load_data_to_s3(transformed_data, "posts", subreddit_name)
 
@@ -22,3 +28,34 @@ async def praw_etl_flow(subreddit_name: str, subreddit_flair: List) -> int:
         await trigger_databrick_job("get_posts_from_s3", path)
 
     return len(raw_data)
+
+@flow(name="Reddit ETL Pipeline", log_prints=True)
+async def reddit_etl_flow(subreddits: List[Dict[str, Any]] = SUBREDDITS) -> int:
+    """
+    Runs the Reddit ingestion of every subreddit, one PRAW flow after the other or, with the
+    'async' extraction mode, all the subreddits concurrently.
+    """
+    if settings.reddit_extraction_mode != "async":
+        total_records = 0
+        for subreddit in subreddits:
+            total_records += await praw_etl_flow(subreddit["name"], subreddit["flairs"])
+        return total_records
+
+    print(f"*** Running async Reddit ETL for subreddits: {[s['name'] for s in subreddits]} ***")
+
+    raw_data_by_subreddit = await extract_reddit_data_async(subreddits)
+
+    total_records = 0
+    for subreddit_name, posts in raw_data_by_subreddit.items():
+        raw_data, known_posts = split_known_posts(posts)
+        refresh_reddit_metrics(known_posts)
+
+        transformed_data = transform_praw_data(raw_data)
+        path = load_data_to_s3(transformed_data, "posts", subreddit_name)
+
+        if path:
+            await trigger_databrick_job("get_posts_from_s3", path)
+
+        total_records += len(raw_data)
+
+    return total_records
@@ -5,8 +5,8 @@ Imported models are not used, in a traditional way, either way for SqlAlchemy th
 from sqlalchemy import DDL
 from sqlalchemy.exc import ProgrammingError
 
-from core.database import Base, engine
-from models import Article, RedditPost, Company, StockBar
+from core.database import Base, get_engine
+from models import Article, RedditPost, Company, StockBar, IngestionWatermark, RateLimitBucket
 
 def ensure_timescale_setup(engine):
     """
@@ -42,6 +42,7 @@ def ensure_timescale_setup(engine):
 
 def create_tables():
     print("Creating database tables...")
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
     print("Standard tables created successfully.")
     ensure_timescale_setup(engine)
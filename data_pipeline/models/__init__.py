@@ -2,10 +2,14 @@ from .article import Article
 from .reddit_post import RedditPost
 from .stock_bar import StockBar
 from .company import Company
+from .ingestion_watermark import IngestionWatermark
+from .rate_limit_bucket import RateLimitBucket
 
 __all__ = [
     "Article",
     "RedditPost",
     "Company",
     "StockBar",
+    "IngestionWatermark",
+    "RateLimitBucket",
 ]
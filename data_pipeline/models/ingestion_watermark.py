@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.database import Base
+
+import uuid
+
+
+class IngestionWatermark(Base):
+    __tablename__ = "ingestion_watermarks"
+
+    __table_args__ = (
+        UniqueConstraint("source", "key", name="uq_watermark_source_key"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+    )
+    source: Mapped[str] = mapped_column(
+        String(50), nullable=False, comment="The ingestion source (e.g., 'alpaca')."
+    )
+    key: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False,
+        comment="What the watermark tracks within the source (e.g., the stock ticker).",
+    )
+    watermark: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="The latest timestamp already ingested for this source and key.",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, Float, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.database import Base
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(
+        String(255),
+        primary_key=True,
+        comment="The provider and the hashed credential the bucket limits (e.g., 'alpaca:3f9a...').",
+    )
+    tokens: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        comment="Tokens left at updated_at, negative while callers wait for reserved slots.",
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
@@ -1,11 +1,15 @@
 from .article_service import ArticleService
 from .company_service import CompanyService
+from .rate_limit_service import RateLimitService
 from .reddit_post_service import RedditService
 from .stock_bar_service import StockBarService
+from .watermark_service import WatermarkService
 
 __all__ = [
     "ArticleService",
     "CompanyService",
+    "RateLimitService",
     "RedditService",
     "StockBarService",
+    "WatermarkService",
 ]
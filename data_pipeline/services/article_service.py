@@ -1,17 +1,55 @@
 
-from typing import Dict, List, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
 
 from sqlalchemy import Row, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from models.article import Article
 
+import uuid
+
 
 class ArticleService:
     @staticmethod
     def create_many(session: Session, articles: List[Article]) -> None:
         session.add_all(articles)
 
+    @staticmethod
+    def insert_many(session: Session, rows: List[Dict[str, Any]], batch_size: int) -> Dict[str, uuid.UUID]:
+        """
+        Inserts the articles that aren't stored yet, one INSERT ... ON CONFLICT DO NOTHING per
+        batch, so concurrent loaders never fail on a unique violation. An article conflicts
+        when its URL or its id (derived from the canonical URL) is already stored.
+
+        The rows are deduped by id and URL first, a statement can't touch the same row twice.
+        Returns the id of every inserted article by URL.
+        """
+        seen_ids, seen_urls, unique_rows = set(), set(), []
+        for row in rows:
+            if row["id"] in seen_ids or row["url"] in seen_urls:
+                continue
+            seen_ids.add(row["id"])
+            seen_urls.add(row["url"])
+            unique_rows.append(row)
+
+        inserted: Dict[str, uuid.UUID] = {}
+        for start in range(0, len(unique_rows), batch_size):
+            stmt = (
+                insert(Article)
+                .values(unique_rows[start:start + batch_size])
+                .on_conflict_do_nothing()
+                .returning(Article.url, Article.id)
+            )
+            inserted.update({url: article_id for url, article_id in session.execute(stmt)})
+
+        return inserted
+
+    @staticmethod
+    def get_ids_by_urls(session: Session, urls: Iterable[str]) -> Dict[str, uuid.UUID]:
+        stmt = select(Article.url, Article.id).where(Article.url.in_(list(urls)))
+        return {url: article_id for url, article_id in session.execute(stmt)}
+
     @staticmethod
     def get_existing_urls(session: Session, urls: Dict) -> Sequence[Article]:
         return (
@@ -23,3 +61,21 @@ class ArticleService:
             .scalars()
             .all()
         )
+
+    @staticmethod
+    def get_existing_url_values(session: Session, urls: List[str]) -> Sequence[str]:
+        return (
+            session.execute(
+                select(Article.url).where(
+                    Article.url.in_(urls)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    @staticmethod
+    def get_all_urls(session: Session) -> Iterator[str]:
+        return session.execute(
+            select(Article.url).execution_options(yield_per=10000)
+        ).scalars()
@@ -0,0 +1,30 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.rate_limit_bucket import RateLimitBucket
+
+
+class RateLimitService:
+    @staticmethod
+    def reserve(session: Session, key: str, rate: float, capacity: float, cost: float) -> float:
+        """
+        Refills the bucket for the time elapsed since its last use, takes cost tokens out of it
+        and returns what is left, all in one atomic statement. A negative result means the
+        caller reserved a future slot and has to wait -tokens / rate seconds before using it.
+
+        The database clock is used on purpose, so workers on different hosts agree on time.
+        """
+        now = func.clock_timestamp()
+        elapsed = func.extract("epoch", now - RateLimitBucket.updated_at)
+
+        stmt = insert(RateLimitBucket).values(key=key, tokens=capacity - cost, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={
+                "tokens": func.least(capacity, RateLimitBucket.tokens + elapsed * rate) - cost,
+                "updated_at": now,
+            },
+        ).returning(RateLimitBucket.tokens)
+
+        return session.execute(stmt).scalar_one()
@@ -1,6 +1,7 @@
 
-from typing import Dict, List, Sequence
-from sqlalchemy import select
+from typing import Any, Dict, Iterator, List, Sequence
+from sqlalchemy import Float, Integer, String, column, or_, select, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from models.reddit_post import RedditPost
@@ -11,6 +12,71 @@ class RedditService:
     def create_many(session: Session, reddit_posts: List[RedditPost]) -> None:
         session.add_all(reddit_posts)
 
+    @staticmethod
+    def insert_many(session: Session, rows: List[Dict[str, Any]], batch_size: int) -> List[str]:
+        """
+        Inserts the posts that aren't stored yet, one INSERT ... ON CONFLICT DO NOTHING per
+        batch. Rows are deduped by reddit_id first, the last one wins. Returns the reddit_ids
+        actually inserted.
+        """
+        unique_rows = list({row["reddit_id"]: row for row in rows}.values())
+
+        inserted: List[str] = []
+        for start in range(0, len(unique_rows), batch_size):
+            stmt = (
+                insert(RedditPost)
+                .values(unique_rows[start:start + batch_size])
+                .on_conflict_do_nothing()
+                .returning(RedditPost.reddit_id)
+            )
+            inserted.extend(session.execute(stmt).scalars())
+
+        return inserted
+
+    @staticmethod
+    def refresh_metrics(session: Session, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        """
+        Writes the current score, comment count and upvote ratio of already stored posts, one
+        UPDATE ... FROM (VALUES ...) per batch. Only the posts whose metrics changed are
+        written, an unchanged post costs no new row version and no WAL. Returns how many posts
+        were updated.
+        """
+        unique_rows = list({row["reddit_id"]: row for row in rows}.values())
+
+        updated = 0
+        for start in range(0, len(unique_rows), batch_size):
+            metrics = values(
+                column("reddit_id", String),
+                column("score", Integer),
+                column("number_of_comments", Integer),
+                column("upvote_ratio", Float),
+                name="metrics",
+            ).data([
+                (row["reddit_id"], row["score"], row["number_of_comments"], row["upvote_ratio"])
+                for row in unique_rows[start:start + batch_size]
+            ])
+
+            stmt = (
+                update(RedditPost)
+                .where(RedditPost.reddit_id == metrics.c.reddit_id)
+                .where(
+                    or_(
+                        RedditPost.score.is_distinct_from(metrics.c.score),
+                        RedditPost.number_of_comments.is_distinct_from(metrics.c.number_of_comments),
+                        RedditPost.upvote_ratio.is_distinct_from(metrics.c.upvote_ratio),
+                    )
+                )
+                .values(
+                    score=metrics.c.score,
+                    number_of_comments=metrics.c.number_of_comments,
+                    upvote_ratio=metrics.c.upvote_ratio,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            updated += session.execute(stmt).rowcount
+
+        return updated
+
     @staticmethod
     def get_existing_posts(session: Session, reddit_ids: Dict) -> Sequence[str]:
         return (
@@ -23,3 +89,8 @@ class RedditService:
             .all()
         )
 
+    @staticmethod
+    def get_all_reddit_ids(session: Session) -> Iterator[str]:
+        return session.execute(
+            select(RedditPost.reddit_id).execution_options(yield_per=10000)
+        ).scalars()
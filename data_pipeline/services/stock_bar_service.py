@@ -1,12 +1,119 @@
-
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+import csv
+import io
+
+from models.company import Company
 from models.stock_bar import StockBar
 
 
+# Column order of the rows given to copy_many()
+COPY_COLUMNS = (
+    "id",
+    "company_id",
+    "timestamp",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+    "volume",
+    "trade_count",
+    "vwap",
+)
+
+# Rows written to the COPY stream per buffer
+COPY_BUFFER_ROWS = 50_000
+
+
 class StockBarService:
     @staticmethod
     def create_many(session: Session, stock_bars: List[StockBar]) -> None:
         session.add_all(stock_bars)
 
+    @staticmethod
+    def insert_many(session: Session, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        """
+        Inserts the bars that aren't stored yet, one INSERT ... ON CONFLICT DO NOTHING per
+        batch, a bar already stored for the company and minute (uq_symbol_timestamp) is
+        skipped. Rows are deduped on (company_id, timestamp) first, the last one wins. Returns
+        how many bars were inserted.
+        """
+        unique_rows = list({(row["company_id"], row["timestamp"]): row for row in rows}.values())
+
+        inserted = 0
+        for start in range(0, len(unique_rows), batch_size):
+            stmt = (
+                insert(StockBar)
+                .values(unique_rows[start:start + batch_size])
+                .on_conflict_do_nothing()
+                .returning(StockBar.id)
+            )
+            inserted += len(session.execute(stmt).all())
+
+        return inserted
+
+    @staticmethod
+    def copy_many(session: Session, rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Bulk loads bars with COPY instead of the unit of work. The rows (in COPY_COLUMNS order)
+        are streamed into a temporary staging table, which is then merged into stock_bars in a
+        single INSERT ... SELECT, skipping the bars already stored (uq_symbol_timestamp).
+        Returns how many bars were inserted.
+
+        The staging table lives until the end of the transaction, the caller commits.
+        """
+        columns = ", ".join(COPY_COLUMNS)
+        cursor = session.connection().connection.cursor()
+
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS stock_bars_staging "
+                "(LIKE stock_bars INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.execute("TRUNCATE stock_bars_staging")
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            buffered = 0
+            for row in rows:
+                writer.writerow(row)
+                buffered += 1
+
+                if buffered == COPY_BUFFER_ROWS:
+                    StockBarService._copy_buffer(cursor, buffer, columns)
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    buffered = 0
+
+            if buffered:
+                StockBarService._copy_buffer(cursor, buffer, columns)
+
+            cursor.execute(
+                f"INSERT INTO stock_bars ({columns}) "
+                f"SELECT {columns} FROM stock_bars_staging "
+                "ON CONFLICT (company_id, timestamp) DO NOTHING"
+            )
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _copy_buffer(cursor: Any, buffer: io.StringIO, columns: str) -> None:
+        # An empty unquoted field is NULL in the CSV format
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY stock_bars_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    @staticmethod
+    def get_latest_timestamps(session: Session, tickers: List[str]) -> Dict[str, datetime]:
+        stmt = (
+            select(Company.ticker, func.max(StockBar.timestamp))
+            .join(StockBar, StockBar.company_id == Company.id)
+            .where(Company.ticker.in_(tickers))
+            .group_by(Company.ticker)
+        )
+
+        return {ticker: latest for ticker, latest in session.execute(stmt)}
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.ingestion_watermark import IngestionWatermark
+
+
+class WatermarkService:
+    @staticmethod
+    def get_many(session: Session, source: str, keys: List[str]) -> Dict[str, datetime]:
+        stmt = select(IngestionWatermark.key, IngestionWatermark.watermark).where(
+            IngestionWatermark.source == source,
+            IngestionWatermark.key.in_(keys),
+        )
+
+        return {key: watermark for key, watermark in session.execute(stmt)}
+
+    @staticmethod
+    def advance_many(session: Session, source: str, watermarks: Dict[str, datetime]) -> None:
+        """
+        Moves the watermarks forward, a run that loaded older data never moves them back.
+        """
+        if not watermarks:
+            return
+
+        stmt = insert(IngestionWatermark).values(
+            [
+                {"source": source, "key": key, "watermark": watermark}
+                for key, watermark in watermarks.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_watermark_source_key",
+            set_={
+                "watermark": func.greatest(
+                    IngestionWatermark.watermark, stmt.excluded.watermark
+                ),
+                "updated_at": func.now(),
+            },
+        )
+        session.execute(stmt)
@@ -1,26 +1,64 @@
 from alpaca.common.exceptions import APIError
-from alpaca.data import BarSet
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from celery import group
-from datetime import date, datetime, timedelta
+from celery.result import ResultSet
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from newsapi import NewsApiClient
 from newsapi.newsapi_exception import NewsAPIException
 from praw.exceptions import APIException, ClientException
 from prefect import task
 from requests import RequestException
-from trafilatura import extract, extract_metadata
-from typing import Any, Dict, Iterator, List, Optional
+from time import perf_counter
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Tuple
 
 from celery_app import app
+from core.article_parser import EXTRACTION_MODES, parse_article_in_pool, serves_mode
+from core.bar_columns import (
+    BarColumns,
+    bar_columns_from_raw,
+    bar_count,
+    concat_bar_columns,
+    drop_bars_before,
+    drop_symbols,
+    empty_bar_columns,
+)
 from core.config_loader import settings
-from core.constants import DATA_FETCH_LIMIT_PER_FLOW, DEFAULT_ARTICLE_DATA
+from core.celery_results import GroupCollector
+from core.content_types import SNIFF_BYTES, SkippedContent, body_skip_reason, classify_content_type, is_skipped_host
+from core.constants import ALPACA_WATERMARK_SOURCE, DATA_FETCH_LIMIT_PER_FLOW, DEFAULT_ARTICLE_DATA
+from core.database import get_db
+from core.extraction_cache import get_extraction_cache
+from core.extraction_stats import ExtractionStats
+from core.http_client import get_host_limiter, get_http_client, run_in_worker_loop
+from core.known_items import KnownItemIndex
+from core.rate_limiter import get_rate_limiter
+from core.reddit_client import AsyncRedditClient
+from core.partitioning import FETCH_SECONDS_KEY, get_worker_concurrency, host_latencies, partition, url_host
+from core.request_budget import RequestBudget
+from services import ArticleService, RedditService, StockBarService, WatermarkService
 
 import asyncio
 import httpx
+import math
 import praw
-import numpy as np
+
+known_article_urls = KnownItemIndex(
+    "article urls",
+    ArticleService.get_all_urls,
+    ArticleService.get_existing_url_values,
+    settings.known_items_capacity,
+    settings.known_items_refresh_seconds,
+)
+known_reddit_ids = KnownItemIndex(
+    "reddit ids",
+    RedditService.get_all_reddit_ids,
+    RedditService.get_existing_posts,
+    settings.known_items_capacity,
+    settings.known_items_refresh_seconds,
+)
 
 # ------------------------------
 # PREFECT TASKS
@@ -29,71 +67,70 @@ import numpy as np
 def extract_news_data(query: str, start_date: datetime = None, end_date: datetime = None) -> List[Dict]:
     print(f"-> Starting NewsAPI extraction for query: {query}")
 
-    if not start_date or not end_date:
-        start_date = datetime.today() - timedelta(days=2)
-        end_date = start_date + timedelta(days=1)
+    from_date_str, to_date_str = news_date_range(start_date, end_date)
+    budget = RequestBudget(settings.news_api_max_requests_per_run)
 
-    from_date_str = start_date.strftime("%Y-%m-%d")
-    to_date_str = end_date.strftime("%Y-%m-%d")
-    print(f"-> Data range: {from_date_str} to {to_date_str}")
+    articles = fetch_news_pages(query, from_date_str, to_date_str, budget)
+    get_rate_limiter("newsapi").report()
+    articles = drop_known_articles(dedupe_by_url(articles))
 
-    try:
-        api = NewsApiClient(api_key=settings.news_api_key)
-        data = api.get_everything(
-            q=query, language="en", from_param=from_date_str, to=to_date_str
-        )
-    except NewsAPIException as e:
-        print(f"Error occured in the NewsAPI client: {e}")
-        return []
-    except Exception as e:
-        print(f"Unhandled Error: {e}")
-        return []
-
-    if not data or not isinstance(data, dict):
-        print("The NewsAPI response is invalid.")
-        print(f"This is the response:\n{data}")
-        return []
-
-    if data.get("status") == "error":
-        print(f"NewsAPI returned an error {data.get('code')}.")
-        print(f"The error message is:\n'{data.get('message')}'.")
-        return []
-
-    if data.get("totalResults") == 0:
-        print("Warning API call succeeded but returned 0 articles.")
+    if not articles:
+        print("No new articles found.")
         return []
 
+    return fetch_article_contents(articles)
 
-    articles: List[Dict[str, Any]] = data["articles"]
-    article_chunks = np.array_split(articles, 4)
-
-    if not articles:
-        print("No articles found.")
-        return []
+@task(name="Extract NewsAPI Data For All Categories")
+def extract_all_news_data(
+    categories: Dict[str, str], start_date: datetime = None, end_date: datetime = None
+) -> Dict[str, List[Dict]]:
+    """
+    Pages through every category query concurrently under one shared request budget, merges
+    the results and fetches the content of each distinct article only once. An article
+    matching several queries is kept in the first category it belongs to.
+    """
+    print(f"-> Starting NewsAPI extraction for {len(categories)} categories.")
 
+    from_date_str, to_date_str = news_date_range(start_date, end_date)
+    budget = RequestBudget(settings.news_api_max_requests_per_run)
 
+    with ThreadPoolExecutor(max_workers=settings.news_api_max_concurrency) as executor:
+        futures = {
+            category: executor.submit(fetch_news_pages, query, from_date_str, to_date_str, budget)
+            for category, query in categories.items()
+        }
+        pages = {category: future.result() for category, future in futures.items()}
+
+    merged: List[Dict[str, Any]] = []
+    seen_urls = set()
+    for category, articles in pages.items():
+        for article in articles:
+            url = article.get("url")
+            if not url or url in seen_urls:
+                continue
+            seen_urls.add(url)
+            article["_category"] = category
+            merged.append(article)
+
+    get_rate_limiter("newsapi").report()
+
+    fetched_count = sum(len(articles) for articles in pages.values())
     print(
-        f"-> Dispatching {len(articles)} article content fetching tasks to Celery."
+        f"-> Fetched {fetched_count} articles with {budget.used} requests, "
+        f"{fetched_count - len(merged)} duplicates across categories removed."
     )
-    task_signatures = [
-        fetch_and_extract_content.s(chunk.tolist()) 
-        for chunk in article_chunks
-    ]
 
-    task_group = group(task_signatures)
-    result = task_group.apply_async()
+    by_category: Dict[str, List[Dict]] = {category: [] for category in categories}
 
-    print("-> Waiting for Celery workers to return 4 batches of full content...")
+    merged = drop_known_articles(merged)
+    if not merged:
+        print("No new articles found.")
+        return by_category
 
-    try:
-        batch_results = result.get(timeout=60)
-        final_articles = [article for batch in batch_results for article in batch]
-        print(f"<- Finished extracting the articles.")
-        return final_articles
-    except Exception as e:
-        print(f"Error retrieving Celery results (Timeout or Task Failure): {e}")
-        print(f"Retrying the task.")
-        return []
+    for article in fetch_article_contents(merged):
+        by_category[article.pop("_category")].append(article)
+
+    return by_category
 
 @task(name="Extract PRAW Data")
 def extract_praw_data(subreddit: str, flairs: list[str]) -> List[Dict]:
@@ -110,6 +147,9 @@ def extract_praw_data(subreddit: str, flairs: list[str]) -> List[Dict]:
     subreddit_obj = reddit.subreddit(subreddit)
     post_list: list = []
 
+    # PRAW reads the listing lazily, 100 posts per request
+    get_rate_limiter("reddit").acquire(cost=math.ceil(DATA_FETCH_LIMIT_PER_FLOW / 100))
+
     try:
         if flairs:
             data = subreddit_obj.search(
@@ -159,67 +199,152 @@ def extract_praw_data(subreddit: str, flairs: list[str]) -> List[Dict]:
         print(f"PRAW failed during mapping the fetch data inot a list. Reason: {e}")
         return []
 
-    url_chunks = np.array_split(url_list, 4)
+    post_list, url_list, known_posts = drop_known_posts(post_list, url_list)
+
+    if not post_list:
+        print("No new reddit posts found.")
+        return known_posts
+
+    # Text posts have no linked article and media hosts serve no article, only the other
+    # link posts are sent to the workers and the results are mapped back to their post by position.
+    for reddit_post in post_list:
+        reddit_post.update(DEFAULT_ARTICLE_DATA)
+
+    link_positions = [
+        i for i, url in enumerate(url_list)
+        if url and not is_skipped_host(url_host(url), settings.http_skipped_hosts)
+    ]
+    link_urls = [url_list[i] for i in link_positions]
+
+    if not link_urls:
+        print(f"<- Finished extracting the reddit posts, none of them links an article.")
+        return post_list + known_posts
+
+    url_chunks = partition(
+        link_urls,
+        get_worker_concurrency(),
+        settings.partition_min_urls_per_chunk,
+        cost=host_latencies.cost,
+        group_key=url_host,
+    )
 
     task_signatures = [
-        fetch_article_task.s(chunk.tolist()) for chunk in url_chunks
+        fetch_article_task.s([link_urls[i] for i in chunk]) for chunk in url_chunks
     ]
 
-    print(f"-> Dispatching {len(post_list)} article fetching tasks to Celery.")
+    print(f"-> Dispatching {len(link_urls)} article fetching tasks to Celery.")
     task_group = group(task_signatures)
     result = task_group.apply_async()
 
-    print("-> Waiting for Celery workers to return 4 batches of full content...")
+    print(f"-> Waiting for Celery workers to return {len(url_chunks)} batches of full content...")
 
-    try:
-        batch_results = result.get(timeout=60)
-        final_articles = [article for batch in batch_results for article in batch]
+    # Posts of late or failed chunks keep the default article data.
+    collector = GroupCollector(result, settings.celery_result_deadline_seconds, revoke_late=True)
+    for index, batch in collector:
+        for position, article in zip(url_chunks[index], batch):
+            host_latencies.record_result(link_urls[position], article)
+            post_list[link_positions[position]].update(article)
+    collector.report(f"r/{subreddit} articles")
 
-        for reddit_post, article in zip(post_list, final_articles):
-            reddit_post.update(article)
+    print(f"<- Finished extracting the reddit posts with their linked article.")
+    return post_list + known_posts
 
-        print(f"<- Finished extracting the reddit posts with their linked article.")
-        return post_list
-    except Exception as e:
-        print(f"Error retrieving Celery results (Timeout or Task Failure): {e}")
-        return []
+@task(name="Extract Reddit Data (async)")
+async def extract_reddit_data_async(subreddits: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
+    """
+    Async counterpart of extract_praw_data for several subreddits at once. The listing pages
+    of all the subreddits are fetched concurrently and the linked articles of every page are
+    sent to the Celery workers as soon as the page arrives, instead of after the last one.
+
+    It runs on the flow's event loop, so it must be awaited.
+    """
+    print(f"-> Starting async Reddit extraction for {len(subreddits)} subreddits.")
+
+    posts_by_subreddit, pending = await stream_reddit_posts(subreddits)
+
+    def collect_articles() -> None:
+        # Posts of late or failed chunks keep the default article data.
+        collector = GroupCollector(
+            ResultSet([async_result for async_result, _ in pending]),
+            settings.celery_result_deadline_seconds,
+            revoke_late=True,
+        )
+        for index, batch in collector:
+            for reddit_post, article in zip(pending[index][1], batch):
+                host_latencies.record_result(reddit_post["url"], article)
+                reddit_post.update(article)
+        collector.report("Reddit articles")
+
+    if pending:
+        # Waiting on the Celery results blocks, it must not hold up the flow's event loop.
+        await asyncio.to_thread(collect_articles)
+
+    get_rate_limiter("reddit").report()
+
+    post_count = sum(len(posts) for posts in posts_by_subreddit.values())
+    print(f"<- Finished extracting {post_count} reddit posts with their linked article.")
+    return posts_by_subreddit
 
 @task(name="Extract Alpaca Data")
-def extract_alpaca_data(symbol_list: List[str], start_date: datetime = None, end_date: datetime = None) -> List[Dict]:
+def extract_alpaca_data(symbol_list: List[str], start_date: datetime = None, end_date: datetime = None) -> BarColumns:
+    """
+    Without an explicit start_date every symbol is fetched from its own high-watermark up to
+    end_date (by default the latest minute Alpaca serves), so a missed run is caught up by the
+    next one and a repeated run only asks for the few minutes it doesn't have yet.
+
+    The bars are returned as columns (see core.bar_columns), not as a dict per bar.
+    """
     print(f"-> Starting Alpaca extraction for stocks: {symbol_list}")
-    alpaca_client = StockHistoricalDataClient(settings.alpaca_api_key, settings.alpaca_secret_key) 
 
-    if not start_date or not end_date:
-        start_date = datetime.today() - timedelta(days=2)
-        end_date = start_date + timedelta(days=1)
+    if start_date and end_date:
+        windows = {start_date: {symbol: start_date for symbol in symbol_list}}
+    else:
+        end_date = end_date or alpaca_extraction_end()
+        windows = plan_alpaca_windows(symbol_list, end_date)
 
-    request = StockBarsRequest(
-        symbol_or_symbols=symbol_list,
-        timeframe=TimeFrame.Minute,
-        start=start_date,
-        end=end_date
-    )
+    if not windows:
+        print("-> Every symbol is already up to date, nothing to extract.")
+        return empty_bar_columns()
 
-    try:
-        data = alpaca_client.get_stock_bars(request)
-    except APIError as e:
-        print(f"-> Alpaca API error occurred:\n{e}")
-        return []
-    except Exception as e:
-        print(f"-> An unhandled error occurred:\n{e}")
-        return []
-
-    # alpaca_client.get_stock_bars() method return either a BarSet or RawData
-    # in the BarSet scenario we use it's dict() method to turn it into a dictionary for reference look alpaca/data/models/bars.py
-    # in the other scenario the RawData is a dictionary for reference look alpaca/common/types.py
-    if isinstance(data, BarSet):
-        data_dict = data.dict()
-    else: data_dict = data
+    shards = plan_alpaca_shards(windows, end_date)
+    print(f"-> Dispatching {len(shards)} Alpaca shards (symbol group x time window) to Celery.")
 
-    all_bars = []
-    for bar in data_dict.values():
-        all_bars.extend(bar)
+    task_group = group(
+        fetch_stock_bars.s(symbols, shard_start.isoformat(), shard_end.isoformat())
+        for symbols, shard_start, shard_end in shards
+    )
+    result = task_group.apply_async()
 
+    collector = GroupCollector(result, settings.celery_result_deadline_seconds, revoke_late=True)
+    shard_bars = collector.collect()
+    collector.report("Alpaca shards")
+
+    # A symbol missing any of its shards would have a hole in its history, and the watermark
+    # would move past it. Its bars are dropped instead so the next run fetches them all again.
+    incomplete_symbols = {
+        symbol
+        for index in [*collector.late, *collector.failed]
+        for symbol in shards[index][0]
+    }
+    if incomplete_symbols:
+        print(f"-> Dropping the bars of {sorted(incomplete_symbols)}, some of their shards are missing.")
+
+    all_bars = concat_bar_columns(
+        shard_bars[index]
+        for index in sorted(shard_bars)
+    )
+    all_bars = drop_symbols(all_bars, incomplete_symbols)
+
+    # A symbol sharing a window that starts before its own start got bars it already has.
+    late_starts = {
+        symbol: start
+        for window_start, symbol_starts in windows.items()
+        for symbol, start in symbol_starts.items()
+        if start > window_start
+    }
+    all_bars = drop_bars_before(all_bars, late_starts)
+
+    print(f"<- Merged {bar_count(all_bars)} bars from {len(shard_bars)} shards.")
     return all_bars
 
 
@@ -234,17 +359,23 @@ def extract_alpaca_data(symbol_list: List[str], start_date: datetime = None, end
     soft_time_limit=300,
     time_limit=330,
 )
-def fetch_and_extract_content(self, articles_batch: List[Dict])  -> List[Dict]:
+def fetch_and_extract_content(self, articles_batch: List[Dict], extraction_mode: Optional[str] = None)  -> List[Dict]:
     print(f"  -> [Worker] Starting async batch fetch for {len(articles_batch)} articles.")
     
+    stats = ExtractionStats()
+    mode = extraction_mode or settings.article_extraction_mode
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}")
+
     async def main():
-        async with httpx.AsyncClient() as client:
-            tasks = [fetch_one_url(client, article) for article in articles_batch]
-            processed_articles = await asyncio.gather(*tasks)
-            return processed_articles
+        client = get_http_client()
+        tasks = [timed_fetch(fetch_one_url(client, article, stats, mode)) for article in articles_batch]
+        return await asyncio.gather(*tasks)
 
-    results = asyncio.run(main())
+    results = run_in_worker_loop(main())
     print(f"  -> [Worker] Finished async batch for {len(results)} articles.")
+    print(f"  -> [Worker] Stage timings: {stats.summary()}")
+    print_cache_stats()
     return results
 
 @app.task(
@@ -255,17 +386,23 @@ def fetch_and_extract_content(self, articles_batch: List[Dict])  -> List[Dict]:
     soft_time_limit=300,
     time_limit=330,
 )
-def fetch_article_task(self, urls: List[Optional[str]]) -> List[Dict[str, Any]]:
+def fetch_article_task(self, urls: List[Optional[str]], extraction_mode: Optional[str] = None) -> List[Dict[str, Any]]:
     print(f"  -> [Worker] Starting async batch fetch for {len(urls)} articles.")
 
+    stats = ExtractionStats()
+    mode = extraction_mode or settings.article_extraction_mode
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}")
+
     async def main():
-        async with httpx.AsyncClient() as client:
-            tasks = [fetch_and_parse_url(client, url) for url in urls]
-            processed_articles = await asyncio.gather(*tasks)
-            return processed_articles
+        client = get_http_client()
+        tasks = [timed_fetch(fetch_and_parse_url(client, url, stats, mode)) for url in urls]
+        return await asyncio.gather(*tasks)
 
-    results = asyncio.run(main())
+    results = run_in_worker_loop(main())
     print(f"  -> [Worker] Finished async batch for {len(results)} articles.")
+    print(f"  -> [Worker] Stage timings: {stats.summary()}")
+    print_cache_stats()
     return results
 
 @app.task(
@@ -276,23 +413,29 @@ def fetch_article_task(self, urls: List[Optional[str]]) -> List[Dict[str, Any]]:
     soft_time_limit=300,
     time_limit=330,
 )
-def fetch_stock_bars(self, symbols: List[str]) -> List[Dict]:
-    # 🔴 todo: BUG look
-    print(f"  -> [Worker] Starting fetching stock bars for {len(symbols)} symbols.")
+def fetch_stock_bars(self, symbols: List[str], start: str, end: str) -> BarColumns:
+    print(f"  -> [Worker] Starting fetching stock bars for {len(symbols)} symbols from {start} to {end}.")
     
-    print(f"  -> [DEBUG] symbols {symbols}")
-    client = StockHistoricalDataClient(settings.alpaca_api_key, settings.alpaca_secret_key) 
+    # raw_data skips building a pydantic Bar per bar, the payload is read straight into columns
+    client = StockHistoricalDataClient(settings.alpaca_api_key, settings.alpaca_secret_key, raw_data=True)
     
+    # The window travels through the broker as ISO strings
+    start_date, end_date = datetime.fromisoformat(start), datetime.fromisoformat(end)
     request = StockBarsRequest(
         symbol_or_symbols=symbols,
         timeframe=TimeFrame.Minute,
-        start=datetime(2025, 10, 5), 
-        end=datetime(2025, 10, 6)
+        start=start_date, 
+        end=end_date
     )
 
+    # The SDK pages through the bars itself, 10000 per request at most
+    window_minutes = (end_date - start_date).total_seconds() / 60
+    limiter = get_rate_limiter("alpaca")
+    waited = limiter.acquire(cost=max(1, math.ceil(len(symbols) * window_minutes / 10000)))
+    print(f"  -> [Worker] Waited {waited:.2f}s for the Alpaca rate limit.")
+
     try:
         data = client.get_stock_bars(request)
-        print(f"  -> [DEBUG] data:\n{data}")
     except APIError as e:
         print(f"  -> [Worker] Alpaca API error occurred, message error is:\n{e}")
         raise e
@@ -302,19 +445,16 @@ def fetch_stock_bars(self, symbols: List[str]) -> List[Dict]:
 
     print(f"  -> [Worker] Finished fetching raw data.")
 
-    if isinstance(data, BarSet):
-        data_dict = data.dict()
-    else: data_dict = data
-
-    # Flattens the alpaca respone to a list of dictionaries, where each dictionary is stock bar data
-    all_bars = []
+    # Turns the alpaca response into one list per column instead of a dictionary per stock bar.
+    # A failure must fail the shard, an empty result would let the watermarks of its symbols
+    # move past the window it should have covered.
     try:
-        for bar_list in data_dict.values():
-            all_bars.extend(bar_list)
+        all_bars = bar_columns_from_raw(data)
     except Exception as e:
-        print(f"  -> [Worker] Unhandled exception flattening the alpaca response to a list of dictionaries.\nThis is the error message: {e}")
+        print(f"  -> [Worker] Unhandled exception turning the alpaca response into columns.\nThis is the error message: {e}")
+        raise e
 
-    print(f"  -> [Worker] Parsed {len(all_bars)} bars.")
+    print(f"  -> [Worker] Parsed {bar_count(all_bars)} bars.")
     return all_bars
     
 
@@ -326,55 +466,503 @@ def prepare_reddit_query(flairs: list[str]) -> str:
     flair_queries = [f'flair:"{flair}"' for flair in flairs]
     return " OR ".join(flair_queries)
 
-async def fetch_one_url(client: httpx.AsyncClient, article: Dict[str, Any]) -> Dict[str, Any]:
+def print_cache_stats() -> None:
+    cache = get_extraction_cache()
+    if cache is not None:
+        print(f"  -> [Worker] Extraction cache totals for this process: {cache.stats()}")
+
+def news_date_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> Tuple[str, str]:
+    if not start_date or not end_date:
+        start_date = datetime.today() - timedelta(days=2)
+        end_date = start_date + timedelta(days=1)
+
+    from_date_str = start_date.strftime("%Y-%m-%d")
+    to_date_str = end_date.strftime("%Y-%m-%d")
+    print(f"-> Data range: {from_date_str} to {to_date_str}")
+
+    return from_date_str, to_date_str
+
+def fetch_news_pages(query: str, from_date_str: str, to_date_str: str, budget: RequestBudget) -> List[Dict]:
+    """
+    Reads the result pages of a query until NewsAPI has no more results, the plan's result
+    cap is reached or the shared request budget runs out. On an error the pages read so far
+    are kept.
+    """
+    api = NewsApiClient(api_key=settings.news_api_key)
+    limiter = get_rate_limiter("newsapi")
+    articles: List[Dict[str, Any]] = []
+    page = 1
+
+    while True:
+        if not budget.try_spend():
+            print(f"-> NewsAPI request budget exhausted, stopping '{query[:40]}' at page {page}.")
+            break
+
+        limiter.acquire()
+        try:
+            data = api.get_everything(
+                q=query,
+                language="en",
+                from_param=from_date_str,
+                to=to_date_str,
+                page=page,
+                page_size=settings.news_api_page_size,
+            )
+        except NewsAPIException as e:
+            print(f"Error occured in the NewsAPI client: {e}")
+            break
+        except Exception as e:
+            print(f"Unhandled Error: {e}")
+            break
+
+        if not data or not isinstance(data, dict):
+            print("The NewsAPI response is invalid.")
+            print(f"This is the response:\n{data}")
+            break
+
+        if data.get("status") == "error":
+            print(f"NewsAPI returned an error {data.get('code')}.")
+            print(f"The error message is:\n'{data.get('message')}'.")
+            break
+
+        page_articles = data.get("articles") or []
+        articles.extend(page_articles)
+
+        total_results = min(data.get("totalResults") or 0, settings.news_api_max_results)
+        if not page_articles or len(articles) >= total_results:
+            break
+
+        page += 1
+
+    if not articles:
+        print(f"Warning NewsAPI returned 0 articles for '{query[:40]}'.")
+
+    return articles
+
+def dedupe_by_url(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen_urls = set()
+    unique = []
+    for article in articles:
+        url = article.get("url")
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        unique.append(article)
+
+    return unique
+
+def fetch_article_contents(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Sends the articles to the Celery workers to download their full content.
+    """
+    article_chunks = partition(
+        articles,
+        get_worker_concurrency(),
+        settings.partition_min_urls_per_chunk,
+        cost=lambda article: host_latencies.cost(article.get("url")),
+        group_key=lambda article: url_host(article.get("url")),
+    )
+
+    print(
+        f"-> Dispatching {len(articles)} article content fetching tasks to Celery."
+    )
+    task_signatures = [
+        fetch_and_extract_content.s([articles[i] for i in chunk])
+        for chunk in article_chunks
+    ]
+
+    task_group = group(task_signatures)
+    result = task_group.apply_async()
+
+    print(f"-> Waiting for Celery workers to return {len(article_chunks)} batches of full content...")
+
+    # Whatever finished before the deadline goes on to the transformation,
+    # the articles of late or failed chunks are left out of this run.
+    collector = GroupCollector(result, settings.celery_result_deadline_seconds, revoke_late=True)
+    final_articles = [article for _, batch in collector for article in batch]
+    collector.report("NewsAPI content")
+
+    for article in final_articles:
+        host_latencies.record_result(article.get("url"), article)
+
+    print(f"<- Finished extracting {len(final_articles)} articles.")
+    return final_articles
+
+def reddit_post_from_json(post: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Maps a post of the Reddit listing API to the same record extract_praw_data builds.
+    """
+    return {
+        "reddit_id": post["id"],
+        "subreddit": post.get("subreddit"),
+        "author": post.get("author") or "[deleted]",
+        "title": post.get("title"),
+        "selftext": post.get("selftext"),
+        "score": post.get("score"),
+        "num_comments": post.get("num_comments"),
+        "is_text_post": post.get("is_self"),
+        "url": post.get("url"),
+        "link_flair_text": post.get("link_flair_text") or "",
+        "upvote_ratio": post.get("upvote_ratio"),
+        "permalink": post.get("permalink"),
+        "published_at": post.get("created_utc"),
+    }
+
+async def stream_reddit_posts(
+    subreddits: List[Dict[str, Any]]
+) -> Tuple[Dict[str, List[Dict]], List[Tuple[Any, List[Dict]]]]:
+    """
+    Returns the new posts of every subreddit, and the dispatched article fetching tasks
+    together with the posts each of them fills in.
+    """
+    posts_by_subreddit: Dict[str, List[Dict]] = {s["name"]: [] for s in subreddits}
+    pending: List[Tuple[Any, List[Dict]]] = []
+    concurrency = get_worker_concurrency()
+
+    async def consume(subreddit: Dict[str, Any]) -> None:
+        name = subreddit["name"]
+        query = prepare_reddit_query(subreddit["flairs"]) if subreddit["flairs"] else None
+
+        try:
+            async for page in reddit.iter_listing(name, query, DATA_FETCH_LIMIT_PER_FLOW):
+                posts = [reddit_post_from_json(post) for post in page]
+                urls = [post["url"] if not post["is_text_post"] else None for post in posts]
+                posts, _, known_posts = await asyncio.to_thread(drop_known_posts, posts, urls)
+
+                for reddit_post in posts:
+                    reddit_post.update(DEFAULT_ARTICLE_DATA)
+                posts_by_subreddit[name].extend(posts)
+                posts_by_subreddit[name].extend(known_posts)
+
+                link_posts = [
+                    post for post in posts
+                    if not post["is_text_post"]
+                    and post["url"]
+                    and not is_skipped_host(url_host(post["url"]), settings.http_skipped_hosts)
+                ]
+                for chunk in partition(
+                    link_posts,
+                    concurrency,
+                    settings.partition_min_urls_per_chunk,
+                    cost=lambda post: host_latencies.cost(post["url"]),
+                    group_key=lambda post: url_host(post["url"]),
+                ):
+                    batch = [link_posts[i] for i in chunk]
+                    async_result = fetch_article_task.apply_async(args=[[post["url"] for post in batch]])
+                    pending.append((async_result, batch))
+        except Exception as e:
+            print(f"Unhandled Error: async Reddit extraction failed for r/{name}. Reason: {e}")
+
+    async with httpx.AsyncClient(timeout=settings.http_timeout_seconds) as client:
+        reddit = AsyncRedditClient(client)
+        await asyncio.gather(*(consume(subreddit) for subreddit in subreddits))
+
+    return posts_by_subreddit, pending
+
+def alpaca_extraction_end() -> datetime:
+    """
+    The most recent minute that can be requested, Alpaca doesn't serve the last 15 minutes
+    of SIP data without a paid subscription.
+    """
+    end = datetime.now(timezone.utc) - timedelta(minutes=settings.alpaca_data_delay_minutes)
+    return end.replace(second=0, microsecond=0)
+
+def plan_alpaca_windows(symbols: List[str], end_date: datetime) -> Dict[datetime, Dict[str, datetime]]:
+    """
+    Groups the symbols by the start of the window they still miss, every window maps its
+    symbols to their own start. Each symbol starts right after its high-watermark, the latest
+    of its last stored bar and its ingestion watermark.
+
+    Symbols whose starts are less than alpaca_window_merge_minutes apart share one request
+    starting at the earliest of them. The bars a later starting symbol gets before its own
+    start were already extracted, extract_alpaca_data drops them.
+    """
+    latest_bars: Dict[str, datetime] = {}
+    watermarks: Dict[str, datetime] = {}
+    try:
+        with get_db() as session:
+            latest_bars = StockBarService.get_latest_timestamps(session, symbols)
+            watermarks = WatermarkService.get_many(session, ALPACA_WATERMARK_SOURCE, symbols)
+    except Exception as e:
+        print(f"-> Could not read the Alpaca watermarks, every symbol gets the initial backfill: {e}")
+
+    earliest_start = end_date - timedelta(days=settings.alpaca_max_backfill_days)
+    initial_start = end_date - timedelta(days=settings.alpaca_initial_backfill_days)
+
+    starts: Dict[str, datetime] = {}
+    for symbol in symbols:
+        known = [t for t in (latest_bars.get(symbol), watermarks.get(symbol)) if t]
+        start = max(known) + timedelta(minutes=1) if known else initial_start
+        start = max(start, earliest_start)
+
+        if start < end_date:
+            starts[symbol] = start
+
+    windows: Dict[datetime, Dict[str, datetime]] = {}
+    window_start = None
+    for symbol in sorted(starts, key=starts.get):
+        start = starts[symbol]
+        if window_start is None or start - window_start > timedelta(minutes=settings.alpaca_window_merge_minutes):
+            window_start = start
+        windows.setdefault(window_start, {})[symbol] = start
+
+    print(f"-> Planned {len(windows)} Alpaca windows for {len(starts)}/{len(symbols)} symbols that are behind.")
+    return windows
+
+def plan_alpaca_shards(
+    windows: Dict[datetime, Dict[str, datetime]], end_date: datetime
+) -> List[Tuple[List[str], datetime, datetime]]:
+    """
+    Splits every (start, symbols) window into shards of at most alpaca_symbols_per_shard
+    symbols and alpaca_shard_window_hours of history, so a large backfill over many tickers
+    becomes many small requests the workers run in parallel.
+    """
+    shard_window = timedelta(hours=settings.alpaca_shard_window_hours)
+    group_size = settings.alpaca_symbols_per_shard
+
+    shards = []
+    for window_start, symbol_starts in windows.items():
+        symbols = list(symbol_starts)
+        symbol_groups = [symbols[i:i + group_size] for i in range(0, len(symbols), group_size)]
+
+        shard_start = window_start
+        while shard_start < end_date:
+            shard_end = min(shard_start + shard_window, end_date)
+            shards.extend((symbol_group, shard_start, shard_end) for symbol_group in symbol_groups)
+            shard_start = shard_end
+
+    return shards
+
+def drop_known_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Removes the articles whose URL is already stored, before paying for their download.
+    """
+    try:
+        known_urls = known_article_urls.find_known(a.get("url") for a in articles)
+    except Exception as e:
+        print(f"-> Could not check the known article URLs, nothing will be skipped: {e}")
+        return articles
+
+    return [article for article in articles if article.get("url") not in known_urls]
+
+def drop_known_posts(
+    post_list: List[Dict], url_list: List[Optional[str]]
+) -> Tuple[List[Dict], List[Optional[str]], List[Dict]]:
+    """
+    Removes the already stored reddit posts together with their linked article URL. The
+    removed posts are returned on their own, flagged with is_known, so their metrics can be
+    refreshed (empty when the reddit_refresh_known_metrics setting is off).
+    """
+    try:
+        known_ids = known_reddit_ids.find_known(post["reddit_id"] for post in post_list)
+    except Exception as e:
+        print(f"-> Could not check the known reddit IDs, nothing will be skipped: {e}")
+        return post_list, url_list, []
+
+    kept = [
+        (post, url) for post, url in zip(post_list, url_list)
+        if post["reddit_id"] not in known_ids
+    ]
+
+    known_posts = []
+    if settings.reddit_refresh_known_metrics:
+        known_posts = [
+            {**post, "is_known": True} for post in post_list if post["reddit_id"] in known_ids
+        ]
+
+    return [post for post, _ in kept], [url for _, url in kept], known_posts
+
+def split_known_posts(post_list: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Splits the extracted posts into the new ones and the already stored ones.
+    """
+    new_posts = [post for post in post_list if not post.get("is_known")]
+    known_posts = [post for post in post_list if post.get("is_known")]
+    return new_posts, known_posts
+
+async def read_html_body(response: httpx.Response) -> bytes:
+    """
+    Reads the body of a streamed response, giving up as soon as it turns out not to be a HTML
+    page or to be larger than the http_max_body_bytes setting. A large video or PDF costs a
+    few kilobytes instead of its whole transfer.
+    """
+    kind = classify_content_type(response.headers.get("content-type"))
+    if kind not in ("html", "unknown"):
+        raise SkippedContent(kind)
+
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.http_max_body_bytes:
+        raise SkippedContent("too_large")
+
+    body = bytearray()
+    sniffed = False
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) > settings.http_max_body_bytes:
+            raise SkippedContent("too_large")
+
+        # Servers mislabel files often enough that even a 'text/html' body is sniffed.
+        if not sniffed and len(body) >= SNIFF_BYTES:
+            sniffed = True
+            reason = body_skip_reason(kind, bytes(body[:SNIFF_BYTES]))
+            if reason:
+                raise SkippedContent(reason)
+
+    if not sniffed:
+        reason = body_skip_reason(kind, bytes(body))
+        if reason:
+            raise SkippedContent(reason)
+
+    return bytes(body)
+
+async def download_and_parse(
+    client: httpx.AsyncClient, url: str, stats: ExtractionStats, mode: str = "full"
+) -> Dict[str, Any]:
+    """
+    Returns the cached extraction of the URL, or downloads the page on the event loop and
+    hands the HTML over to the parsing pool, so slow pages never stall the other downloads
+    of the batch.
+
+    An expired cache entry is revalidated with a conditional request, when the page hasn't
+    changed the server answers 304 and both the transfer and the parse are skipped. Links to
+    media hosts, non-HTML bodies and oversized pages raise SkippedContent before they are
+    downloaded in full. mode picks the extraction tier, see core.article_parser.
+    """
+    if is_skipped_host(url_host(url), settings.http_skipped_hosts):
+        raise SkippedContent("media_host")
+
+    cache = get_extraction_cache()
+    # The SQLite calls block, they run in a thread so the other downloads keep going. An entry
+    # of a lower tier than mode asks for is a miss, and isn't revalidated either, a 304 would
+    # only bring the same lower tier back.
+    cached = None
+    if cache is not None:
+        cached = await asyncio.to_thread(
+            cache.lookup,
+            url,
+            lambda value: serves_mode(value, mode, settings.article_min_fast_length),
+        )
+
+    if cached is not None and cached["fresh"]:
+        stats.record_cache_hit(cached["value"]["download_bytes"], cached["value"]["parse_seconds"])
+        return cached["value"]
+    if cache is not None:
+        stats.record_cache_miss()
+
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    started = perf_counter()
+    async with get_host_limiter().acquire(url):
+        async with client.stream("GET", url, headers=headers) as response:
+            if headers:
+                not_modified = response.status_code == 304
+                stats.record_revalidation(
+                    not_modified,
+                    cached["value"]["download_bytes"],
+                    cached["value"]["parse_seconds"],
+                )
+                if not_modified:
+                    await asyncio.to_thread(cache.refresh, url)
+                    return cached["value"]
+
+            response.raise_for_status() # Raise HTTP errors
+            html = await read_html_body(response)
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+    stats.record_download(perf_counter() - started)
+
+    # The raw bytes go to the parser, trafilatura works out the page's encoding from them.
+    started = perf_counter()
+    parsed = await parse_article_in_pool(
+        html,
+        settings.parse_pool_workers,
+        mode=mode,
+        min_fast_length=settings.article_min_fast_length,
+    )
+    stats.record_parse(parsed["parse_seconds"], perf_counter() - started, parsed["tier"])
+
+    parsed["download_bytes"] = len(html)
+    if cache is not None and parsed["content"]:
+        await asyncio.to_thread(cache.put, url, parsed, etag=etag, last_modified=last_modified)
+
+    return parsed
+
+async def timed_fetch(fetch: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Attaches how long the URL took to its result, the dispatcher learns the cost of each host
+    from it (see core.partitioning.HostLatencies).
+    """
+    started = perf_counter()
+    result = await fetch
+    return {**result, FETCH_SECONDS_KEY: perf_counter() - started}
+
+async def fetch_one_url(
+    client: httpx.AsyncClient,
+    article: Dict[str, Any],
+    stats: Optional[ExtractionStats] = None,
+    mode: str = "full",
+) -> Dict[str, Any]:
     """
     Helper method used to exctract the full article content from a news URL source.
     """
+    stats = stats or ExtractionStats()
+
     url = article.get("url")
     if not url:
         article["content"] = None
         return article
     
     try:
-        response = await client.get(url, timeout=15.0, follow_redirects=True)
-        content = extract(response.text)
-        article["content"] = content
+        parsed = await download_and_parse(client, url, stats, mode)
+        article["content"] = parsed["content"]
+    except SkippedContent as e:
+        stats.record_skip(e.reason)
+        article["content"] = None
     except Exception as e:
         print(f"  -> [Worker] Async fetch failed for {url}: {e}")
+        stats.record_failure()
         article["content"] = None
     
     return article
 
-async def fetch_and_parse_url(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+async def fetch_and_parse_url(
+    client: httpx.AsyncClient,
+    url: str,
+    stats: Optional[ExtractionStats] = None,
+    mode: str = "full",
+) -> Dict[str, Any]:
     """
     Helper method used  to exctract full article and metadata from a news URL source.
     """
+    stats = stats or ExtractionStats()
+
     if not url:
         return DEFAULT_ARTICLE_DATA
 
     try:
-        response = await client.get(url, timeout=15.0, follow_redirects=True)
-        response.raise_for_status() # Raise HTTP errors
-
-        downloaded = response.text
+        parsed = await download_and_parse(client, url, stats, mode)
 
-        article = extract(downloaded)
-        meta = extract_metadata(downloaded)
-
-        if not article or not meta:
+        if not parsed["content"] or not parsed["has_metadata"]:
             return DEFAULT_ARTICLE_DATA
 
         return {
-            "article_headline": meta.title,
-            "article_author": meta.author,
-            "article_publisher": meta.sitename,
-            "article_content": article,
-            "article_published_at": meta.date,
-            "article_category": meta.categories,
+            "article_headline": parsed["title"],
+            "article_author": parsed["author"],
+            "article_publisher": parsed["sitename"],
+            "article_content": parsed["content"],
+            "article_published_at": parsed["date"],
+            "article_category": parsed["categories"],
         }
-        
+
+    except SkippedContent as e:
+        stats.record_skip(e.reason)
+        return DEFAULT_ARTICLE_DATA
     except Exception as e:
         print(f"  -> [Worker] Async fetch failed for {url}: {e}")
+        stats.record_failure()
         return DEFAULT_ARTICLE_DATA
-
-
@@ -1,15 +1,20 @@
 from celery import group
 from prefect import task
 from requests import RequestException
+from time import perf_counter
 from typing import Any, Dict, List
 
 from celery_app import app
+from core.celery_results import GroupCollector
+from core.config_loader import settings
 from core.database import get_db
-from models import Article, RedditPost, StockBar
-from services import ArticleService, CompanyService, RedditService, StockBarService
+from core.partitioning import get_worker_concurrency, partition
+from core.constants import ALPACA_WATERMARK_SOURCE
+from services import ArticleService, CompanyService, RedditService, StockBarService, WatermarkService
+from services.stock_bar_service import COPY_COLUMNS as STOCK_BAR_COLUMNS
 
 import pandas as pd
-import numpy as np
+import uuid
 
 
 @task(name="Dispatch DB Load Task")
@@ -84,11 +89,56 @@ def load_praw_data(data: pd.DataFrame) -> int:
     return posts_inserted
 
 
+@task(name="Refresh Reddit Metrics")
+def refresh_reddit_metrics(posts: List[Dict[str, Any]]) -> int:
+    """
+    Writes the current score, comment count and upvote ratio of the already stored posts.
+    """
+    if not posts:
+        return 0
+
+    rows = [
+        {
+            "reddit_id": post["reddit_id"],
+            "score": post.get("score"),
+            "number_of_comments": post.get("num_comments"),
+            "upvote_ratio": post.get("upvote_ratio"),
+        }
+        for post in posts
+    ]
+
+    print(f"-> [Reddit Dispatcher] Dispatching the metrics of {len(rows)} known posts via Celery.")
+
+    result = refresh_reddit_metrics_task.apply(args=[rows])
+
+    posts_updated = result.get()
+
+    print(
+        f"-> [Reddit Dispatcher] Celery task completed. {posts_updated} Reddit posts had new metrics."
+    )
+
+    return posts_updated
+
+
 @task
 def load_alpaca_data(data_frame: pd.DataFrame, tickers: List):
-    data = data_frame.to_dict("records")
-
-    print(f"-> Starting parallel loading of {len(data)} records.")
+    # The table stores the bars Alpaca reported, the filled gap minutes only go to S3.
+    if "is_filled" in data_frame.columns:
+        data_frame = data_frame[~data_frame["is_filled"]]
+
+    # The chunks travel to the workers as columns, not as a dict per bar
+    data = {
+        "id": data_frame["id"].tolist(),
+        "ticker": data_frame["ticker"].astype(str).tolist(),
+        "timestamp": list(data_frame["timestamp"].dt.to_pydatetime()),
+        **{
+            column: data_frame[column].tolist()
+            for column in ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+        },
+    }
+    row_count = len(data_frame)
+
+    print(f"-> Starting parallel loading of {row_count} records.")
 
     ticker_cache: Dict[str, Any] = {}
 
@@ -106,23 +156,59 @@ def load_alpaca_data(data_frame: pd.DataFrame, tickers: List):
             f"WARNING: Could not find Company records for: {', '.join(missing_tickers)}. Associated bars will be skipped."
         )
 
-    chunks = np.array_split(data, 4)
+    chunks = partition(
+        range(row_count), get_worker_concurrency(), settings.partition_min_rows_per_chunk
+    )
 
     task_signatures = [
-        insert_stock_task.s(stocks.tolist(), ticker_cache) for stocks in chunks
+        insert_stock_task.s(
+            {column: values[chunk[0]:chunk[-1] + 1] for column, values in data.items()},
+            ticker_cache,
+        )
+        for chunk in chunks
     ]
     task_group = group(task_signatures)
     result = task_group.apply_async()
 
-    try:
-        batch_results = result.get(timeout=60)
-        total_stock_length = sum(batch_results)
-        print(f"<- Finished loading {total_stock_length} of stock data.")
-        return True
-    except Exception as e:
-        print(f"Error retrieving Celery results (Timeout or Task Failure): {e}")
-        print(f"Retrying the task.")
-        raise e
+    # Late chunks are not revoked, they keep inserting in the background.
+    collector = GroupCollector(result, settings.celery_result_deadline_seconds)
+    total_stock_length = sum(collector.collect().values())
+    collector.report("Stock bars load")
+
+    if collector.failed:
+        raise next(iter(collector.failed.values()))
+
+    print(f"<- Finished loading {total_stock_length} of stock data.")
+    return True
+
+
+@task(name="Advance Alpaca Watermarks")
+def advance_alpaca_watermarks(data_frame: pd.DataFrame) -> int:
+    """
+    Records the latest bar of every ticker once its data has been delivered, so the next
+    extraction starts right after it.
+    """
+    if data_frame is None or data_frame.empty:
+        return 0
+
+    # Filled gap minutes weren't reported by Alpaca, they don't prove the data got that far.
+    if "is_filled" in data_frame.columns:
+        data_frame = data_frame[~data_frame["is_filled"]]
+
+    latest = data_frame.groupby("ticker", observed=True)["timestamp"].max()
+    watermarks = {ticker: timestamp.to_pydatetime() for ticker, timestamp in latest.items()}
+
+    with get_db() as session:
+        try:
+            WatermarkService.advance_many(session, ALPACA_WATERMARK_SOURCE, watermarks)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error advancing the Alpaca watermarks. Transaction rolled back: {e}")
+            raise e
+
+    print(f"-> Advanced the Alpaca watermarks of {len(watermarks)} tickers.")
+    return len(watermarks)
 
 
 # ----------------------------------------
@@ -144,54 +230,38 @@ def insert_articles_task(self, records: List[Dict[str, Any]], category: str) ->
         print("-> [Worker] Skipping DB insertion, 0 records received.")
         return 0
 
-    with get_db() as session:
-        articles_count = 0
-
-        incoming_article_urls = {r.get("url") for r in records if r.get("url")}
-        existing_articles = ArticleService.get_existing_urls(
-            session, incoming_article_urls
-        )
-        existing_articles_map = {article.url: article for article in existing_articles}
-
-        articles = []
-        for record in records:
-            url = record.get("url")
-
-            if url in existing_articles_map:
-                continue
-
-            article = Article(
-                author=record.get("author"),
-                title=record.get("title"),
-                content=record.get("content"),
-                title_cleaned=record.get("title_cleaned"),
-                content_cleaned=record.get("content_cleaned"),
-                sentiment_strategy=category,
-                published_at=record.get("published_at"),
-                source_name=record.get("source_name"),
-                url=record.get("url"),
-            )
-            articles.append(article)
-
-        articles_count = len(articles)
-        print(
-            f"-> [Worker] Skipped {len(records) - articles_count} articles, cause they already exists."
-        )
+    rows = [
+        {
+            "id": uuid.UUID(record["id"]),
+            "author": record.get("author"),
+            "title": record.get("title"),
+            "content": record.get("content"),
+            "title_cleaned": record.get("title_cleaned"),
+            "content_cleaned": record.get("content_cleaned"),
+            "sentiment_strategy": category,
+            "published_at": record.get("published_at"),
+            "source_name": record.get("source_name"),
+            "url": record.get("url"),
+        }
+        for record in records
+    ]
 
+    with get_db() as session:
         try:
-            ArticleService.create_many(session, articles)
+            articles_count = len(ArticleService.insert_many(session, rows, settings.db_insert_batch_size))
             session.commit()
-            print(
-                f"-> [Worker] Successfully loaded {articles_count} articles to database."
-            )
-            return articles_count
-
         except Exception as e:
             session.rollback()
             print(f"-> [Worker] Error loading data: {e}")
             # Re-raise the exception so Celery can handle retries
             raise e
 
+    print(
+        f"-> [Worker] Skipped {len(records) - articles_count} articles, cause they already exists."
+    )
+    print(f"-> [Worker] Successfully loaded {articles_count} articles to database.")
+    return articles_count
+
 
 @app.task(
     name="insert_reddit_posts_to_db",
@@ -209,110 +279,109 @@ def insert_reddit_posts_task(self, records: List[Dict[str, Any]]) -> int:
         print("-> [Reddit Worker] Skipping DB insertion, 0 records received.")
         return 0
 
-    with get_db() as session:
-        incoming_reddit_ids = {
-            r.get("reddit_id") for r in records if r.get("reddit_id")
-        }
-
-        existing_reddit_ids_query = RedditService.get_existing_posts(
-            session, incoming_reddit_ids
-        )
-
-        existing_reddit_ids = set(existing_reddit_ids_query)
-        print(
-            f"-> [Reddit Worker] Found {len(existing_reddit_ids)} duplicate Reddit posts in DB."
-        )
-
-        incoming_article_urls = {
-            r.get("article_url")
-            for r in records
-            if not r.get("is_text_post") and r.get("article_url")
+    link_records = [
+        r for r in records if not r.get("is_text_post", True) and r.get("article_url")
+    ]
+    article_rows = [
+        {
+            "id": uuid.UUID(record["article_id"]),
+            "author": record.get("article_author"),
+            "title": record.get("article_headline"),
+            "content": record.get("article_content"),
+            "title_cleaned": record.get("article_headline_cleaned"),
+            "content_cleaned": record.get("article_content_cleaned"),
+            "sentiment_strategy": record.get("article_category"),
+            "published_at": record.get("article_published_at"),
+            "source_name": record.get("article_publisher"),
+            "url": record.get("article_url"),
         }
+        for record in link_records
+    ]
 
-        existing_articles_map = {}
-        if incoming_article_urls:
-            existing_articles = ArticleService.get_existing_urls(
-                session, incoming_article_urls
-            )
-            existing_articles_map = {
-                article.url: article for article in existing_articles
-            }
-
-        print(
-            f"-> [Reddit Worker] Found {len(existing_articles_map)} existing Articles in DB."
-        )
-
-        articles_to_insert = []
-        posts_to_insert = []
-        for record in records:
-            reddit_id = record.get("reddit_id")
-
-            if reddit_id in existing_reddit_ids:
-                continue
-
-            article_url = record.get("article_url")
-            is_text_post = record.get("is_text_post", True)
-            article_obj = None
-
-            if not is_text_post and article_url:
-                if article_url in existing_articles_map:
-                    article_obj = existing_articles_map[article_url]
-                else:
-                    article_obj = Article(
-                        author=record.get("article_author"),
-                        title=record.get("article_headline"),
-                        content=record.get("article_content"),
-                        title_cleaned=record.get("article_headline_cleaned"),
-                        content_cleaned=record.get("article_content_cleaned"),
-                        sentiment_strategy=record.get("article_category"),
-                        published_at=record.get("article_published_at"),
-                        source_name=record.get("article_publisher"),
-                        url=record.get("article_url"),
-                    )
-                    articles_to_insert.append(article_obj)
-                    # Add to map/cache for subsequent posts in this batch linking to the same article
-                    existing_articles_map[article_url] = article_obj
-
-            reddit_post = RedditPost(
-                reddit_id=reddit_id,
-                subreddit=record.get("subreddit"),
-                author=record.get("author"),
-                title=record.get("title"),
-                body_text=record.get("body_text"),
-                score=record.get("score"),
-                number_of_comments=record.get("number_of_comments"),
-                is_text_post=is_text_post,
-                subreddit_category=record.get("subreddit_category"),
-                upvote_ratio=record.get("upvote_ratio"),
-                published_at=record.get("published_at"),
-                reddit_post_url=record.get("reddit_post_url"),
-                article=article_obj,
+    with get_db() as session:
+        try:
+            article_ids = ArticleService.insert_many(session, article_rows, settings.db_insert_batch_size)
+            inserted_articles_count = len(article_ids)
+
+            # Articles stored before their ids were derived from the URL are only found by URL,
+            # any other already stored article has the id derived from its URL.
+            stored_urls = {r["article_url"] for r in link_records} - article_ids.keys()
+            if stored_urls:
+                article_ids.update(ArticleService.get_ids_by_urls(session, stored_urls))
+
+            post_rows = []
+            for record in records:
+                is_text_post = record.get("is_text_post", True)
+                article_url = record.get("article_url")
+
+                article_id = None
+                if not is_text_post and article_url:
+                    article_id = article_ids.get(article_url, uuid.UUID(record["article_id"]))
+
+                post_rows.append(
+                    {
+                        "id": uuid.UUID(record["id"]),
+                        "reddit_id": record.get("reddit_id"),
+                        "subreddit": record.get("subreddit"),
+                        "author": record.get("author"),
+                        "title": record.get("title"),
+                        "body_text": record.get("body_text"),
+                        "score": record.get("score"),
+                        "number_of_comments": record.get("number_of_comments"),
+                        "is_text_post": is_text_post,
+                        "subreddit_category": record.get("subreddit_category"),
+                        "upvote_ratio": record.get("upvote_ratio"),
+                        "published_at": record.get("published_at"),
+                        "reddit_post_url": record.get("reddit_post_url"),
+                        "article_id": article_id,
+                    }
+                )
+
+            inserted_posts_count = len(RedditService.insert_many(session, post_rows, settings.db_insert_batch_size))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(
+                f"-> [Reddit Worker] Error loading Reddit data. Transaction rolled back: {e}"
             )
+            raise e
 
-            posts_to_insert.append(reddit_post)
+    print(
+        f"-> [Reddit Worker] Skipped {posts_count_received - inserted_posts_count} Reddit posts, cause they already exists."
+    )
+    print(
+        f"-> [Reddit Worker] Committed {inserted_articles_count + inserted_posts_count} total objects "
+        f"({inserted_articles_count} Articles, {inserted_posts_count} Reddit Posts) to database."
+    )
+    return inserted_posts_count
 
-        total_objects_to_commit = len(articles_to_insert) + len(posts_to_insert)
-        inserted_posts_count = len(posts_to_insert)
 
+@app.task(
+    name="refresh_reddit_metrics",
+    bind=True,
+    autoretry_for=(RequestException,),
+    retry_kwargs={"max_retries": 2, "countdown": 30},
+    soft_time_limit=300,
+    time_limit=330,
+)
+def refresh_reddit_metrics_task(self, rows: List[Dict[str, Any]]) -> int:
+    with get_db() as session:
         try:
-            if articles_to_insert:
-                ArticleService.create_many(session, articles_to_insert)
-
-            RedditService.create_many(session, posts_to_insert)
+            updated_count = RedditService.refresh_metrics(session, rows, settings.db_insert_batch_size)
             session.commit()
-            print(
-                f"-> [Reddit Worker] Committed {total_objects_to_commit} total objects "
-                f"({len(articles_to_insert)} Articles, {inserted_posts_count} Reddit Posts) to database."
-            )
-            return inserted_posts_count
-
         except Exception as e:
             session.rollback()
             print(
-                f"-> [Reddit Worker] Error loading Reddit data. Transaction rolled back: {e}"
+                f"-> [Reddit Worker] Error refreshing Reddit metrics. Transaction rolled back: {e}"
             )
             raise e
 
+    print(
+        f"-> [Reddit Worker] Updated the metrics of {updated_count} of {len(rows)} known Reddit posts, "
+        f"the others were unchanged."
+    )
+    return updated_count
+
 
 @app.task(
     name="insert_stock_to_db",
@@ -322,39 +391,44 @@ def insert_reddit_posts_task(self, records: List[Dict[str, Any]]) -> int:
     soft_time_limit=300,
     time_limit=330,
 )
-def insert_stock_task(self, records: Dict, ticker_cache: Dict) -> int:
-    stocks = []
-    for record in records:
-        ticker = record.get("ticker")
-
-        company_id = ticker_cache.get(ticker)
-
-        if not company_id:
-            continue
-
-        stocks.append(
-            StockBar(
-                company_id=company_id,
-                timestamp=record.get("timestamp"),
-                open_price=record.get("open"),
-                high_price=record.get("high"),
-                low_price=record.get("low"),
-                close_price=record.get("close"),
-                volume=record.get("volume"),
-                trade_count=record.get("trade_count"),
-                vwap=record.get("vwap"),
-            )
+def insert_stock_task(self, columns: Dict[str, List], ticker_cache: Dict) -> int:
+    rows = [
+        (uuid.UUID(bar_id), company_id, timestamp, open_price, high_price, low_price, close_price, volume, trade_count, vwap)
+        for bar_id, ticker, timestamp, open_price, high_price, low_price, close_price, volume, trade_count, vwap in zip(
+            columns["id"],
+            columns["ticker"],
+            columns["timestamp"],
+            columns["open"],
+            columns["high"],
+            columns["low"],
+            columns["close"],
+            columns["volume"],
+            columns["trade_count"],
+            columns["vwap"],
         )
+        if (company_id := ticker_cache.get(ticker))
+    ]
 
+    started = perf_counter()
     with get_db() as session:
         try:
-            StockBarService.create_many(session, stocks)
+            if settings.stock_bar_load_method == "copy":
+                stock_length = StockBarService.copy_many(session, rows)
+            else:
+                stock_length = StockBarService.insert_many(
+                    session,
+                    [dict(zip(STOCK_BAR_COLUMNS, row)) for row in rows],
+                    settings.db_insert_batch_size,
+                )
             session.commit()
-
-            stock_length = len(stocks)
-            print(f"Successfully loaded {stock_length} stocks to database.")
-            return stock_length
         except Exception as e:
             session.rollback()
             print(f"Error loading stock bar data. Transaction rolled back: {e}")
             raise e
+
+    seconds = perf_counter() - started
+    print(
+        f"Successfully loaded {stock_length} of {len(rows)} stocks to database with "
+        f"{settings.stock_bar_load_method} in {seconds:.2f}s ({len(rows) / seconds if seconds else 0:.0f} rows/s)."
+    )
+    return stock_length
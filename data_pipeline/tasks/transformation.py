@@ -1,10 +1,19 @@
-from typing import Any, Dict, List, Tuple
-import uuid
+from itertools import chain
+from typing import Any, Dict, List, Tuple, Union
 from pandas import DataFrame
 from prefect import task
 
+from core.bar_columns import BarColumns, bar_columns_frame, bar_count
+from core.config_loader import settings
+from core.constants import MARKET_OPEN_MINUTE, MARKET_SESSION_MINUTES, MARKET_TIMEZONE
+from core.data_profile import profile_data
+from core.identifiers import article_id_column, reddit_post_id_column, stock_bar_id_column
+from core.text_cleaning import clean_text_column
+
+import numpy as np
 import pandas as pd
 import re
+import resource
 
 
 # ----------------------------------------
@@ -44,17 +53,26 @@ def transform_news_data(data: List[Dict[str, Any]]) -> DataFrame:
     )
     print("Renamed and dropped columns.")
 
+    # Without a URL there is nothing to derive the id from, and every such row would
+    # collapse into a single duplicate below.
+    missing_url = data_frame["url"].isna() | (data_frame["url"].astype(str).str.strip() == "")
+    if missing_url.any():
+        data_frame = data_frame.loc[~missing_url].copy()
+        print(f"Dropped {int(missing_url.sum())} rows without a URL.")
+
+    # The id derives from the canonical URL, so the same article behind different tracking
+    # parameters is a duplicate too.
+    print("Adding a id column")
+    data_frame["id"] = article_id_column(data_frame["url"])
+
     initial_rows = len(data_frame)
-    data_frame = data_frame.drop_duplicates(subset=["url"], keep="first")
+    data_frame = data_frame.drop_duplicates(subset=["id"], keep="first")
     print(f"Removed {initial_rows - len(data_frame)} duplicate rows.")
 
-    data_frame["title_cleaned"] = data_frame["title"].apply(clean_text_for_nlp)
-    data_frame["content_cleaned"] = data_frame["content"].apply(clean_text_for_nlp)
+    data_frame["title_cleaned"] = clean_text_column(data_frame["title"])
+    data_frame["content_cleaned"] = clean_text_column(data_frame["content"])
     print("Created 'title_cleaned' and 'content_cleaned' for prediction model.")
 
-    print("Adding a id column")
-    data_frame["id"] = [uuid.uuid4() for _ in range(len(data_frame))]
-
     print("Ensure data types are correct")
     data_frame["published_at"] = pd.to_datetime(data_frame["published_at"], utc=True)
     data_frame["published_at"] = data_frame["published_at"].astype("datetime64[us, UTC]")
@@ -73,126 +91,143 @@ def transform_news_data(data: List[Dict[str, Any]]) -> DataFrame:
 
     print("Transformation is completed.")
 
-    data_analysis(data_frame)
+    profile_data(data_frame, "news")
 
     return data_frame
 
 
 @task
 def transform_praw_data(data: List[Dict]) -> DataFrame:
+    """
+    The rows are filtered on a frame of the key columns only. Every output column is then
+    built once from the kept posts (filled, cleaned and converted on its own) and the frame is
+    assembled from them at the end, without consolidating, so no step copies the frame or
+    converts the text a second time.
+    """
     print("Transforming PRAW data...")
+    peak_before = peak_rss_mib()
 
     if len(data) == 0:
         print("There are 0 subreddit post records, the transformation taks will be skipped.")
         return DataFrame()
 
-    data_frame = DataFrame(data)
+    # The columns DataFrame(data) would have, in the same order
+    raw_columns = list(dict.fromkeys(chain.from_iterable(data)))
 
-    data_frame = data_frame.rename(
-        columns={
-            "selftext": "body_text",
-            "num_comments": "number_of_comments",
-            "link_flair_text": "subreddit_category",
-            "permalink": "reddit_post_url",
-            "url": "article_url",
-        }
+    # Object dtype, the keys aren't converted to strings just to be compared
+    keys = DataFrame(
+        {
+            REDDIT_COLUMN_NAMES.get(column, column): [post.get(column, np.nan) for post in data]
+            for column in REDDIT_KEY_COLUMNS
+        },
+        dtype=object,
     )
-    print("Renamed columns")
 
-    # Insterting into the database article_category as a list will raise and error
-    # so we turning it into a string
-    data_frame['article_category'] = data_frame['article_category'].apply(
-        lambda x: ", ".join(x) if isinstance(x, list) else x
-    )
+    duplicated = keys.duplicated(subset=["reddit_id", "reddit_post_url"], keep="first")
+    missing_keys = keys[["reddit_id", "subreddit", "published_at"]].isna().any(axis=1)
 
-    initial_rows = len(data_frame)
-    data_frame = data_frame.drop_duplicates(
-        subset=["reddit_id", "reddit_post_url"], keep="first"
+    # ♻️ todo: better solution instead of removing the data
+    # add a new column to the reddit_posts table that tells if the no text post is fetched or not
+
+    # Removing the post which are not text posts and their article_published_at column is empty
+    link_without_article = (keys["is_text_post"] == False) & (
+        keys["article_published_at"].isna() | keys["article_published_at"].eq("")
     )
-    print(f"Removed {initial_rows - len(data_frame)} duplicate rows.")
 
-    initial_rows = len(data_frame)
-    data_frame = (
-        data_frame.dropna(
-            subset=[
-                "reddit_id",
-                "subreddit",
-                "published_at",
-            ],
-            how="any"
-        )
+    print(f"Removed {int(duplicated.sum())} duplicate rows.")
+    print(
+        f"Removed {int((missing_keys & ~duplicated).sum())} rows without a reddit_id or a subreddit or a published_at."
     )
     print(
-        f"Removed {initial_rows - len(data_frame)} rows without a reddit_id or a subreddit or a published_at."
+        f"Removed {int((link_without_article & ~duplicated & ~missing_keys).sum())} non-text posts with null article data."
     )
 
-    data_frame = data_frame.fillna(
-        {
-            "body_text": "No text",
-            "content": "No text",
-            "subreddit_category": "No category",
-            "score": 0,
-            "number_of_comments": 0,
-            "upvote_ratio": 0.5,
-            "article_author": "Unknown Author",
-            "article_publisher": "Unknown Publisher",
-            "article_headline": "No Title",
-            "article_content": "No Content",
-        }
-    )
+    positions = np.flatnonzero((~(duplicated | missing_keys | link_without_article)).to_numpy())
+    del keys, duplicated, missing_keys, link_without_article
 
-    print("Applying custom filter for non-text posts with null article data...")
-    # ♻️ todo: better solution instead of removing the data
-    # add a new column to the reddit_posts table that tells if the no text post is fetched or not
+    index = pd.Index(positions, dtype="int64")
+    posts = [data[position] for position in positions]
 
-    # Removing the post which are not text posts and their article_published_at column is empty
-    data_frame = data_frame[~((data_frame['is_text_post'] == False) & (data_frame['article_published_at'].isna() | data_frame['article_published_at'].eq('')))]
-    
-    data_frame["article_headline_cleaned"] = data_frame["article_headline"].apply(
-        clean_text_for_nlp
-    )
-    data_frame["article_content_cleaned"] = data_frame["article_content"].apply(
-        clean_text_for_nlp
-    )
+    values: Dict[str, List[Any]] = {}
+    for raw_column in raw_columns:
+        column = REDDIT_COLUMN_NAMES.get(raw_column, raw_column)
+        column_values = [post.get(raw_column, np.nan) for post in posts]
+
+        # Insterting into the database article_category as a list will raise and error
+        # so we turning it into a string
+        if column == "article_category":
+            column_values = [", ".join(x) if isinstance(x, list) else x for x in column_values]
+
+        if column in REDDIT_FILL_VALUES:
+            fill_value = REDDIT_FILL_VALUES[column]
+            column_values = [fill_value if is_missing(x) else x for x in column_values]
+
+        values[column] = column_values
+    print("Renamed columns and handled missing values")
+
+    def object_column(column: str) -> pd.Series:
+        return pd.Series(values[column], index=index, dtype=object)
+
+    derived = {
+        "article_headline_cleaned": clean_text_column(object_column("article_headline")),
+        "article_content_cleaned": clean_text_column(object_column("article_content")),
+    }
     print(
         "Created 'article_headline_cleaned' and 'article_content_cleaned' for prediction model."
     )
 
     print("Adding a id column")
-    data_frame["id"] = [uuid.uuid4() for _ in range(len(data_frame))]
-    data_frame["article_id"] = [uuid.uuid4() for _ in range(len(data_frame))]
+    derived["id"] = reddit_post_id_column(object_column("reddit_id"))
+    derived["article_id"] = article_id_column(object_column("article_url"))
 
     print("Ensure data types are correct")
-    data_frame["published_at"] = pd.to_datetime(
-        data_frame["published_at"], unit="s", utc=True
-    )
-    data_frame["published_at"] = data_frame["published_at"].astype("datetime64[s, UTC]")
-
-    data_frame["article_published_at"] = pd.to_datetime(data_frame["article_published_at"], utc=True)
-    data_frame["article_published_at"] = data_frame["article_published_at"].astype("datetime64[s, UTC]")
-
-    int_columns = ["score", "number_of_comments"]
-    str_columns = ["id", "article_id", "reddit_id", "subreddit", "author", "title", "body_text", "article_url", "subreddit_category", "reddit_post_url", "article_headline", "article_author", "article_publisher", "article_content", "article_category", "article_headline_cleaned", "article_content_cleaned"]
-
-    data_frame[int_columns] = data_frame[int_columns].astype(int)
-    data_frame[str_columns] = data_frame[str_columns].astype(str)
-
-    data_analysis(data_frame)
+    columns: Dict[str, pd.Series] = {}
+    for column in [*values, *derived]:
+        if column == "published_at":
+            series = pd.to_datetime(pd.Series(values[column], index=index), unit="s", utc=True)
+            series = series.astype("datetime64[s, UTC]")
+        elif column == "article_published_at":
+            series = pd.to_datetime(object_column(column), utc=True).astype("datetime64[s, UTC]")
+        elif column in REDDIT_INT_COLUMNS:
+            series = pd.Series(values[column], index=index).astype(int)
+        elif column in REDDIT_STRING_COLUMNS:
+            series = (derived[column] if column in derived else object_column(column)).astype(str)
+        else:
+            series = pd.Series(values[column], index=index)
+
+        columns[column] = series
+        values.pop(column, None)
+
+    # copy=False keeps each column's array as it is, instead of stacking the string columns
+    # into one new block
+    data_frame = DataFrame(columns, index=index, copy=False)
+
+    print(f"-> [Transform] Peak memory {peak_rss_mib():.0f} MiB (was {peak_before:.0f} MiB before the transform).")
+
+    profile_data(data_frame, "reddit")
     return data_frame
 
 
 @task
-def transform_alpaca_data(data: List[Dict]) -> Tuple:
+def transform_alpaca_data(data: Union[BarColumns, List[Dict]]) -> Tuple:
+    """
+    Accepts the bars as columns (see core.bar_columns) or as a list of dicts. Columns are
+    turned into the data frame one array at a time, without any per-bar Python object.
+    """
     print("Transforming Alpaca data...")
 
-    if len(data) == 0:
+    row_count = bar_count(data) if isinstance(data, dict) else len(data)
+    if row_count == 0:
         print("There are 0 stock records, the transformation taks will be skipped.")
         return ()
 
-    data_frame = DataFrame(data)
+    if isinstance(data, dict):
+        data_frame = bar_columns_frame(data)
+    else:
+        data_frame = DataFrame(data)
 
     print("Ensure data types are correct")
-    data_frame["timestamp"] = pd.to_datetime(data_frame["timestamp"], utc=True)
+    data_frame["timestamp"] = pd.to_datetime(data_frame["timestamp"], utc=True, format="ISO8601")
     data_frame["timestamp"] = data_frame["timestamp"].astype("datetime64[us, UTC]")
 
     numerical_columns = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
@@ -203,28 +238,40 @@ def transform_alpaca_data(data: List[Dict]) -> Tuple:
 
     data_frame["symbol"] = data_frame["symbol"].astype("category")
 
+    if settings.alpaca_fill_minute_gaps:
+        data_frame = add_missing_session_minutes(data_frame)
+    else:
+        data_frame["is_filled"] = False
+
     print("Sorting data frame based on timestamp and symbol")
     data_frame = data_frame.sort_values(by=['symbol', 'timestamp'])
 
-    price_cols = ['open', 'high', 'low', 'close', 'vwap']
-    volume_cols = ['volume', 'trade_count']
-
     print("Handling emtpy values")
-    data_frame[price_cols] = data_frame.groupby("symbol")[price_cols].ffill()
-    data_frame[volume_cols] = data_frame[volume_cols].fillna(0)
-    data_frame[price_cols] = data_frame.groupby("symbol")[price_cols].bfill()
+    fill_bars(data_frame)
 
     initial_rows = len(data_frame)
-    data_frame = data_frame.dropna(subset=price_cols)
+    data_frame = data_frame.dropna(subset=BAR_PRICE_COLUMNS)
     final_rows = len(data_frame)
 
     if initial_rows > final_rows:
         print(f"-> [Transform] WARNING: Dropped {initial_rows - final_rows} rows with non-fixable null prices.")
 
-    print(f"-> [Transform] Transformation complete. Returning {final_rows} clean bars.")
+    # Prices stay float64, float32 can't hold every Numeric(12, 4) price exactly. The counts are
+    # always int32, like the Integer (int4) columns they are loaded into, and is_filled always
+    # bool. A per batch downcast would give the parquet files on S3 conflicting schemas.
+    for column in BAR_COUNT_COLUMNS:
+        values = data_frame[column].to_numpy()
+        if len(values) and values.max() > INT32_MAX:
+            raise ValueError(f"A {column} of {values.max()} doesn't fit the Integer column.")
+        data_frame[column] = values.astype(np.int32)
+    data_frame["is_filled"] = data_frame["is_filled"].astype(bool)
+
+    filled_rows = int(data_frame["is_filled"].sum())
+    print(f"-> [Transform] Transformation complete. Returning {final_rows} clean bars, {filled_rows} of them filled gaps.")
 
     data_frame = data_frame.rename(columns={"symbol": "ticker"})
-    data_analysis(data_frame)
+    data_frame["id"] = stock_bar_id_column(data_frame["ticker"], data_frame["timestamp"])
+    profile_data(data_frame, "alpaca")
 
     unique_symbols_list = data_frame["ticker"].unique().tolist()
 
@@ -237,29 +284,6 @@ def transform_alpaca_data(data: List[Dict]) -> Tuple:
 
 
 # 1. FOR THE NEWS API TRANSFORMATION
-def data_analysis(data: DataFrame):
-    print("Head data")
-    print(data.head())
-
-    print("Info data")
-    print(data.info())
-
-    print("Column types")
-    print(data.dtypes)
-
-    print("Check for duplicate rows")
-    print(data.duplicated())
-
-    print("Identify data types")
-    cat_col = [col for col in data.columns if data[col].dtype == "object" or data[col].dtype == "category"]
-    num_col = [col for col in data.columns if data[col].dtype != "object" and data[col].dtype != "category"]
-    print("Categorical columns:", cat_col)
-    print("Numerical columns:", num_col)
-
-    print("Missing values as percentage")
-    print(round((data.isnull().sum() / data.shape[0]) * 100, 2))
-
-
 def handle_missing_values(dt: DataFrame) -> DataFrame:
     original_rows = len(dt)
 
@@ -276,6 +300,10 @@ def handle_missing_values(dt: DataFrame) -> DataFrame:
 
 
 def clean_text_for_nlp(text: str) -> str:
+    """
+    Reference implementation of the text cleaning, the transformations use the batch
+    version in core.text_cleaning, which must keep giving the same output.
+    """
     if pd.isna(text) or text is None:
         return ""
 
@@ -292,5 +320,185 @@ def clean_text_for_nlp(text: str) -> str:
 
 
 # 2. FOR THE REDDIT TRANSFORMATION
+REDDIT_COLUMN_NAMES = {
+    "selftext": "body_text",
+    "num_comments": "number_of_comments",
+    "link_flair_text": "subreddit_category",
+    "permalink": "reddit_post_url",
+    "url": "article_url",
+}
+
+REDDIT_FILL_VALUES = {
+    "body_text": "No text",
+    "content": "No text",
+    "subreddit_category": "No category",
+    "score": 0,
+    "number_of_comments": 0,
+    "upvote_ratio": 0.5,
+    "article_author": "Unknown Author",
+    "article_publisher": "Unknown Publisher",
+    "article_headline": "No Title",
+    "article_content": "No Content",
+}
+
+# The raw columns the rows are filtered on
+REDDIT_KEY_COLUMNS = ["reddit_id", "permalink", "subreddit", "published_at", "is_text_post", "article_published_at"]
+
+REDDIT_INT_COLUMNS = ["score", "number_of_comments"]
+REDDIT_STRING_COLUMNS = [
+    "id",
+    "article_id",
+    "reddit_id",
+    "subreddit",
+    "author",
+    "title",
+    "body_text",
+    "article_url",
+    "subreddit_category",
+    "reddit_post_url",
+    "article_headline",
+    "article_author",
+    "article_publisher",
+    "article_content",
+    "article_category",
+    "article_headline_cleaned",
+    "article_content_cleaned",
+]
+
+
+def is_missing(value: Any) -> bool:
+    """
+    Whether fillna() would fill the value: None or NaN.
+    """
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def peak_rss_mib() -> float:
+    """
+    Peak resident memory of the process so far (ru_maxrss is in KiB on Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
 
 # 3. FOR THE ALPACA API TRANSFORMATION
+BAR_PRICE_COLUMNS = ["open", "high", "low", "close", "vwap"]
+BAR_COUNT_COLUMNS = ["volume", "trade_count"]
+INT32_MAX = np.iinfo(np.int32).max
+
+MINUTE = np.timedelta64(1, "m")
+
+
+def add_missing_session_minutes(data_frame: DataFrame) -> DataFrame:
+    """
+    Adds a row, with null prices and is_filled set, for every minute of the regular session
+    that a symbol has no bar for. Only the days a symbol has bars on are considered (so market
+    holidays get no rows), starting at the symbol's first bar and ending at its last bar of each
+    day, which keeps the partial first day and early closes free of invented minutes. Bars
+    outside the regular session are kept as they are.
+    """
+    data_frame = data_frame.drop_duplicates(subset=["symbol", "timestamp"], keep="first")
+
+    codes = data_frame["symbol"].cat.codes.to_numpy().astype(np.int64)
+    timestamps = data_frame["timestamp"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(dtype="datetime64[us]")
+    local = data_frame["timestamp"].dt.tz_convert(MARKET_TIMEZONE).dt.tz_localize(None)
+
+    # One entry per (symbol, trading day): the session open and the last bar of the day
+    days = DataFrame({
+        "code": codes,
+        "day": local.dt.normalize().to_numpy(),
+        "timestamp": timestamps,
+    }).groupby(["code", "day"], sort=False)["timestamp"].max().reset_index()
+
+    session_open = (
+        (days["day"] + pd.Timedelta(minutes=MARKET_OPEN_MINUTE))
+        .dt.tz_localize(MARKET_TIMEZONE)
+        .dt.tz_convert("UTC")
+        .dt.tz_localize(None)
+        .to_numpy(dtype="datetime64[us]")
+    )
+    first_bar = (
+        DataFrame({"code": codes, "timestamp": timestamps}).groupby("code")["timestamp"].min()
+    )
+
+    day_codes = days["code"].to_numpy()
+    start = np.maximum(session_open, first_bar.reindex(day_codes).to_numpy(dtype="datetime64[us]"))
+    start = session_open + np.ceil((start - session_open) / MINUTE).astype(np.int64) * MINUTE
+    end = np.minimum(
+        session_open + (MARKET_SESSION_MINUTES - 1) * MINUTE,
+        days["timestamp"].to_numpy(dtype="datetime64[us]"),
+    )
+    counts = np.maximum((end - start) // MINUTE + 1, 0).astype(np.int64)
+
+    # The whole grid at once: every day's start repeated, plus the minute offset within the day
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid_codes = np.repeat(day_codes, counts)
+    grid_timestamps = np.repeat(start, counts) + offsets * MINUTE
+
+    # Minute keys (symbol code in the high bits) tell which grid minutes already have a bar
+    def minute_keys(key_codes: np.ndarray, key_timestamps: np.ndarray) -> np.ndarray:
+        return (key_codes << 32) | key_timestamps.astype("datetime64[m]").astype(np.int64)
+
+    missing = ~np.isin(minute_keys(grid_codes, grid_timestamps), minute_keys(codes, timestamps))
+
+    gaps = DataFrame({
+        "symbol": pd.Categorical.from_codes(grid_codes[missing], dtype=data_frame["symbol"].dtype),
+        "timestamp": pd.DatetimeIndex(grid_timestamps[missing]).tz_localize("UTC"),
+        **{column: np.nan for column in [*BAR_PRICE_COLUMNS, *BAR_COUNT_COLUMNS]},
+    })
+
+    data_frame = data_frame.assign(is_filled=False)
+    gaps["is_filled"] = True
+    print(f"-> [Transform] Found {len(gaps)} missing session minutes.")
+
+    return pd.concat([data_frame, gaps], ignore_index=True)
+
+
+def fill_within_groups(values: np.ndarray, group_start: np.ndarray, group_end: np.ndarray) -> np.ndarray:
+    """
+    Forward fill then backward fill of the nulls, never across a group boundary. The rows
+    must be sorted by group, group_start/group_end hold the first/last row of each row's group.
+    """
+    positions = np.arange(len(values))
+    valid = ~np.isnan(values)
+
+    previous = np.maximum.accumulate(np.where(valid, positions, -1))
+    following = np.minimum.accumulate(np.where(valid, positions, len(values))[::-1])[::-1]
+
+    filled = values.copy()
+    use_previous = ~valid & (previous >= group_start)
+    filled[use_previous] = values[previous[use_previous]]
+
+    use_following = ~valid & ~use_previous & (following <= group_end)
+    filled[use_following] = values[following[use_following]]
+
+    return filled
+
+
+def fill_bars(data_frame: DataFrame) -> None:
+    """
+    Fills the null prices and counts in place, in one vectorized pass per column instead of a
+    groupby ffill and a groupby bfill. The frame must be sorted by symbol and timestamp.
+
+    A null price of a reported bar takes the symbol's previous (else next) value of that
+    column. A filled gap minute is a minute without trades, so all its prices are the previous
+    close and its counts are 0.
+    """
+    codes = data_frame["symbol"].cat.codes.to_numpy()
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries - 1, [len(codes) - 1]))
+    sizes = ends - starts + 1
+    group_start, group_end = np.repeat(starts, sizes), np.repeat(ends, sizes)
+
+    is_filled = data_frame["is_filled"].to_numpy()
+    close = fill_within_groups(data_frame["close"].to_numpy(dtype="float64"), group_start, group_end)
+
+    for column in BAR_PRICE_COLUMNS:
+        values = close if column == "close" else fill_within_groups(
+            data_frame[column].to_numpy(dtype="float64"), group_start, group_end
+        )
+        data_frame[column] = np.where(is_filled, close, values)
+
+    for column in BAR_COUNT_COLUMNS:
+        data_frame[column] = data_frame[column].fillna(0)
+